@@ -1,37 +1,50 @@
+from startup import phase, record_phase, mark_ready, snapshot, process_started
 from flask import Flask, render_template, request, jsonify, Response, stream_with_context, send_from_directory
 from flask_cors import CORS
-from task_store import tasks, load_tasks, save_tasks, task_lock, delete_task, get_all_tasks, add_task
-from utils import get_output_template
-from download_manager import delete_temp_files, enqueue_custom_download, start_next_queued_task
-import yt_dlp
+from task_store import tasks, load_tasks, save_tasks, task_lock, delete_task, get_all_tasks, add_task, refresh_playlist
+from utils import get_output_template, get_thumbnail_url, create_thumbnail_variant
+from download_manager import delete_temp_files, enqueue_custom_download, download_thumbnail, disk_admission, fetch_thumbnails_later
+from info_cache import store_info, lookup_info, start_purger
+from resume_admission import resume_admitter
+from task_archive import search_archive, start_archiver
+from extraction_governor import governor, thumbnail_governor
+from settings import WORKER_MODE, PLAYLIST_PAGE_SIZE, THUMBNAIL_MAX_AGE, IMPORT_BATCH_SIZE
+from bulk_import import import_urls, iter_lines, VALID_FORMATS
+from ydl_pool import ydl_pool, get_http_session
 import os
 import uuid
 import json
 import time
-import requests
+import itertools
 import threading
 import signal
 import sys
 import shutil
 
+record_phase("imports", process_started)
+
 app = Flask(__name__)
+# Static URLs aren't versioned, so browsers revalidate them (ETag/Last-Modified, 304) on every use;
+# only the per-task thumbnail files are cached long term
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = None
 CORS(app)
 
 os.makedirs("downloads", exist_ok=True)
 os.makedirs("thumbnails", exist_ok=True)
 
-# Load and resume
-load_tasks()
-
-with task_lock:
-    for task_id, task in list(tasks.items()):
-        task.pop("should_abort", None)
-        if task.get("status") in ("queued", "running") and not task.get("paused"):
-            task["status"] = "running"
-            enqueue_custom_download(task_id, task["url"], task["quality"], task["format"])
-        elif task.get("paused"):
-            task["status"] = "paused"
-    save_tasks()
+# Load and resume (runs in the background once the server is bound)
+def resume_tasks():
+    to_resume = []
+    with task_lock:
+        for task_id, task in list(tasks.items()):
+            task.pop("should_abort", None)
+            if task.get("status") in ("queued", "running", "held") and not task.get("paused"):
+                to_resume.append(task_id)
+            elif task.get("paused"):
+                task["status"] = "paused"
+        save_tasks()
+    # 🐢 Paced, so a restart with many pending tasks doesn't start them all at once
+    resume_admitter.submit(to_resume)
 
 # Graceful shutdown
 
@@ -55,7 +68,7 @@ def monitor_internet():
     fail_count = 0
     while True:
         try:
-            requests.get("https://www.google.com", timeout=3)
+            get_http_session().get("https://www.google.com", timeout=3)
             fail_count = 0
         except:
             fail_count += 1
@@ -69,7 +82,71 @@ def monitor_internet():
                     save_tasks()
         time.sleep(5)
 
-threading.Thread(target=monitor_internet, daemon=True).start()
+
+# Background startup
+init_lock = threading.Lock()
+init_started = False
+
+
+def background_init(after_load=None):
+    try:
+        with phase("load_tasks"):
+            load_tasks()
+        if after_load:
+            with phase("after_load"):
+                after_load()
+        with phase("resume_tasks"):
+            resume_tasks()
+        threading.Thread(target=monitor_internet, daemon=True).start()
+        start_archiver()
+        start_purger()
+        disk_admission.start_recheck()
+        mark_ready()
+
+        # 🔥 Warm the yt-dlp import so the first detection doesn't pay for it
+        with phase("warm_yt_dlp"):
+            import yt_dlp  # noqa: F401
+
+        # 🖼️ Small variants for thumbnails stored before variants existed
+        with phase("thumbnail_variants"):
+            for name in os.listdir("thumbnails"):
+                path = os.path.join("thumbnails", name)
+                if os.path.isfile(path):
+                    create_thumbnail_variant(path)
+    except Exception as e:
+        print(f"[ERROR] Startup failed: {e}")
+
+
+def start_background_init(after_load=None):
+    """🚀 Load and resume tasks off the request path (idempotent)"""
+    global init_started
+    with init_lock:
+        if init_started:
+            return
+        init_started = True
+    threading.Thread(target=background_init, args=(after_load,), daemon=True).start()
+
+
+def bind_server(host, port):
+    """🔌 Bind the HTTP socket first, then initialize everything else in the background"""
+    from werkzeug.serving import make_server
+
+    with phase("bind"):
+        server = make_server(host, port, app, threaded=True)
+    return server
+
+
+def serve(host, port, after_load=None):
+    server = bind_server(host, port)
+    start_background_init(after_load)
+    print(f"🚀 Serving on http://{host}:{port}")
+    server.serve_forever()
+
+
+@app.before_request
+def ensure_started():
+    # Covers WSGI servers that import `app` without going through serve()
+    start_background_init()
 
 # Routes
 @app.route('/')
@@ -82,18 +159,48 @@ def tasks_page():
     return render_template('platform/tasks.html')
 
 
+@app.route('/ready')
+def ready():
+    state = snapshot()
+    return jsonify(state), (200 if state["ready"] else 503)
+
+
 @app.route('/get-tasks')
 def get_tasks():
     return jsonify({"tasks": get_all_tasks()})
 
 
+@app.route('/archive')
+def archive():
+    try:
+        limit = min(500, max(1, int(request.args.get("limit", 50))))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    return jsonify(search_archive(
+        query=request.args.get("q"),
+        status=request.args.get("status"),
+        task_id=request.args.get("id"),
+        limit=limit,
+        offset=offset
+    ))
+
+
 @app.route('/control-task/<task_id>/<action>', methods=['POST'])
 def control_task(task_id, action):
     with task_lock:
         if task_id not in tasks:
             return jsonify({"error": "Task not found"}), 404
+        is_playlist = "children" in tasks[task_id]
 
-        task = tasks[task_id]
+    if is_playlist:
+        return control_playlist(task_id, action)
+
+    with task_lock:
+        task = tasks.get(task_id)
+        if not task:
+            return jsonify({"error": "Task not found"}), 404
 
         if action == 'pause':
             task['paused'] = True
@@ -108,17 +215,37 @@ def control_task(task_id, action):
                 task['status'] = 'running'
                 enqueue_custom_download(task_id, task['url'], task['quality'], task['format'])
 
+        elif action == 'retry':
+            if task.get('status') == 'failed':
+                task['paused'] = False
+                task['should_abort'] = False
+                task['progress'] = '0%'
+                task['status'] = 'queued'
+                enqueue_custom_download(task_id, task['url'], task['quality'], task['format'])
+
         elif action == 'delete':
             task['paused'] = True
             task['status'] = 'deleted'
             task['should_abort'] = True
 
         save_tasks()
+        parent_id = task.get('parent_id')
 
     time.sleep(0.5)
 
     if action == 'delete':
-        with task_lock:
+        remove_tasks([task_id])
+
+    if parent_id:
+        refresh_playlist(parent_id)
+    
+    return jsonify({"success": True})
+
+
+def remove_tasks(task_ids):
+    """🗑️ Clean temp files and delete tasks already flagged as deleted"""
+    with task_lock:
+        for task_id in task_ids:
             task = tasks.get(task_id)
             if task:
                 temp_path = get_output_template("temp_downloads", task["format"])
@@ -126,7 +253,53 @@ def control_task(task_id, action):
 
             delete_task(task_id)
 
-    
+
+def control_playlist(parent_id, action):
+    """🧩 Apply a control action to every child of a playlist task"""
+    with task_lock:
+        parent = tasks.get(parent_id)
+        if not parent:
+            return jsonify({"error": "Task not found"}), 404
+        child_ids = [c for c in parent.get("children", []) if c in tasks]
+        children = [tasks[c] for c in child_ids]
+        to_queue = []
+
+        if action == 'pause':
+            for child in children:
+                if child.get('status') in ('running', 'queued'):
+                    child['paused'] = True
+                    child['status'] = 'paused'
+                    child['progress'] = 'Paused'
+                    child['should_abort'] = True
+
+        elif action in ('resume', 'retry'):
+            for child in children:
+                if action == 'resume' and child.get('paused') and child.get('progress') != '100%':
+                    to_queue.append(child['id'])
+                elif action == 'retry' and child.get('status') == 'failed':
+                    child['progress'] = '0%'
+                    to_queue.append(child['id'])
+            for child_id in to_queue:
+                tasks[child_id]['paused'] = False
+                tasks[child_id]['should_abort'] = False
+
+        elif action == 'delete':
+            for task in children + [parent]:
+                task['paused'] = True
+                task['status'] = 'deleted'
+                task['should_abort'] = True
+
+        save_tasks()
+
+    if to_queue:
+        resume_admitter.submit(to_queue)
+
+    if action == 'delete':
+        time.sleep(0.5)
+        remove_tasks(child_ids + [parent_id])
+    else:
+        refresh_playlist(parent_id)
+
     return jsonify({"success": True})
 
 @app.route('/control-task/delete-all', methods=['POST'])
@@ -174,22 +347,12 @@ def resume_all_tasks_unique():
             if t.get('paused') and t.get('progress') != '100%'
         ]
 
-        # Count currently running
-        running_count = sum(1 for t in tasks.values() if t.get('status') == 'running')
-        available_slots = max(0, 4 - running_count)
-
-        # Set status based on available slots
-        for i, task in enumerate(paused_tasks):
+        for task in paused_tasks:
             task['paused'] = False
             task['should_abort'] = False
 
-            if i < available_slots:
-                task['status'] = 'running'
-                enqueue_custom_download(task['id'], task['url'], task['quality'], task['format'])
-            else:
-                task['status'] = 'queued'
-
-        save_tasks()
+    # Queued in one write, then admitted at a ramped pace
+    resume_admitter.submit([t['id'] for t in paused_tasks])
 
     return jsonify({"success": True})
 
@@ -201,26 +364,15 @@ def download_selected():
     if not data or 'videos' not in data:
         return jsonify(success=False, error="No videos provided"), 400
 
+    thumbnails = []
     for video in data['videos']:
         task_id = uuid.uuid4().hex[:8]
         video_url = video['url']
         quality = video['quality']
         fmt = video['format']
         title = video.get('title', video_url)
-        thumb_url = video.get('thumbnail')
-        thumb_path = None
-
-        if thumb_url:
-            try:
-                ext = os.path.splitext(thumb_url.split("?")[0])[1]
-                filename = f"{task_id}{ext}"
-                thumb_path = os.path.join("thumbnails", filename)
-                r = requests.get(thumb_url, timeout=5)
-                if r.status_code == 200:
-                    with open(thumb_path, "wb") as f:
-                        f.write(r.content)
-            except:
-                thumb_path = None
+        if video.get('thumbnail'):
+            thumbnails.append((task_id, video['thumbnail']))
 
         add_task(task_id, {
             'id': task_id,
@@ -234,13 +386,31 @@ def download_selected():
             'status': 'queued',
             'paused': False,
             'should_abort': False,
-            'thumbnail_path': thumb_path
+            'thumbnail': video.get('thumbnail'),
+            'info_ref': lookup_info(video_url),
+            'created_at': time.time()
         })
 
         enqueue_custom_download(task_id, video_url, quality, fmt)
 
+    fetch_thumbnails_later(thumbnails)
     return jsonify(success=True)
 
+@app.route('/import', methods=['POST'])
+def import_url_list():
+    """📥 Queue every URL of a newline-delimited list (raw body or `file` upload), streamed"""
+    fmt = request.args.get('format', 'video')
+    if fmt not in VALID_FORMATS:
+        return jsonify(success=False, error=f"Unknown format: {fmt}"), 400
+    quality = request.args.get('quality', '720')
+    batch_size = max(1, request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int))
+
+    upload = request.files.get('file')
+    source = upload.stream if upload else request.stream
+    stats = import_urls(iter_lines(source), quality, fmt, batch_size, on_batch=resume_admitter.submit)
+    print(f"📥 Imported {stats['imported']} URLs in {stats['batches']} batch(es).")
+    return jsonify(success=True, **stats)
+
 @app.route("/contact")
 def contact():
     return render_template("platform/contact.html")
@@ -261,8 +431,9 @@ def detect():
         if is_playlist:
             return jsonify({"type": "playlist"})
         ydl_opts = {'quiet': True, 'noplaylist': True, 'extract_flat': False}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+        with ydl_pool.checkout("detect", ydl_opts) as ydl:
+            info = governor.call(video_url, ydl.extract_info, video_url, download=False)
+            store_info(ydl, video_url, info)
         return jsonify({
             "type": "video",
             "video": {
@@ -285,43 +456,69 @@ def detect_playlist_stream():
     if not video_url:
         return jsonify({"error": "Missing video_url"}), 400
 
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    if limit is not None and limit <= 0:
+        return jsonify({"error": "limit must be positive"}), 400
+
     def generate():
         try:
-            ydl_opts = {'quiet': True, 'extract_flat': True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_url, download=False)
-
-            if info.get('_type') != 'playlist':
-                yield f"data: {json.dumps({'error': 'Not a playlist'})}\n\n"
-                return
-
-            for idx, entry in enumerate(info.get("entries", [])):
-                # Step 1: Immediate Metadata
-                video_data = {
-                    "id": idx,
-                    "title": entry.get("title"),
-                    "duration": entry.get("duration") or 0,
-                    "url": entry.get("url") or entry.get("webpage_url"),
-                    "thumbnail": "/static/images/default-thumbnail.png",  # Temp thumbnail
-                    "qualities": ["144", "240", "360", "480", "720", "1080"]
-                }
-                yield f"data: {json.dumps(video_data)}\n\n"
-                time.sleep(0.05)
-
-            # Step 2: Background thumbnail fetch (slow but separate)
+            ydl_opts = {'quiet': True, 'extract_flat': 'in_playlist', 'lazy_playlist': True}
+            missing_thumbs = []  # only (index, url) pairs are kept, never whole entries
+            sent = 0
+            last_idx = offset - 1  # also counts empty entries, so pages don't overlap
+
+            with ydl_pool.checkout("playlist", ydl_opts) as ydl:
+                info = governor.call(video_url, ydl.extract_info, video_url, download=False, process=False)
+                if info and info.get('_type') in ('url', 'url_transparent'):
+                    info = governor.call(info['url'], ydl.extract_info, info['url'], download=False, process=False)
+
+                if not info or info.get('_type') != 'playlist':
+                    yield f"data: {json.dumps({'error': 'Not a playlist'})}\n\n"
+                    return
+
+                # Step 1: Immediate metadata, streamed page by page as yt-dlp fetches it
+                entries = iter_playlist_entries(info.get("entries"), offset, limit, url=info.get("webpage_url") or video_url)
+                for idx, entry in entries:
+                    last_idx = idx
+                    if not entry:
+                        continue
+                    url = entry.get("url") or entry.get("webpage_url")
+                    thumbnails = entry.get("thumbnails") or []
+                    thumb_url = entry.get("thumbnail") or (thumbnails[-1].get("url") if thumbnails else None)
+                    if not thumb_url and url:
+                        missing_thumbs.append((idx, url))
+
+                    video_data = {
+                        "id": idx,
+                        "title": entry.get("title"),
+                        "duration": entry.get("duration") or 0,
+                        "url": url,
+                        "thumbnail": thumb_url or "/static/images/default-thumbnail.png",
+                        "qualities": ["144", "240", "360", "480", "720", "1080"]
+                    }
+                    sent += 1
+                    yield f"data: {json.dumps(video_data)}\n\n"
+
+            # Step 2: Background thumbnail fetch (slow but separate), only where the flat entry had none
             ydl_opts = {'quiet': True, 'extract_flat': False, 'skip_download': True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                for idx, entry in enumerate(info.get("entries", [])):
+            with ydl_pool.checkout("metadata", ydl_opts) as ydl:
+                for idx, url in missing_thumbs:
                     try:
-                        detailed = ydl.extract_info(entry['url'], download=False)
+                        detailed = governor.call(url, ydl.extract_info, url, download=False)
+                        store_info(ydl, url, detailed)
                         thumb_url = detailed.get("thumbnail")
                         if thumb_url:
                             yield f"event: thumb\ndata: {json.dumps({'id': idx, 'thumbnail': thumb_url})}\n\n"
                             time.sleep(0.1)
-                    except Exception as inner:
+                    except Exception:
                         continue
 
-            yield "event: done\ndata: end\n\n"
+            more = limit is not None and last_idx + 1 >= offset + limit
+            yield f"event: done\ndata: {json.dumps({'count': sent, 'next_offset': last_idx + 1 if more else None})}\n\n"
 
         except Exception as e:
             yield f"event: error\ndata: {str(e)}\n\n"
@@ -329,10 +526,54 @@ def detect_playlist_stream():
     return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 
+def iter_playlist_entries(entries, offset=0, limit=None, url=None):
+    """📃 Yield (index, entry) for a range of playlist entries without materializing the list.
+
+    Every page fetch goes through the extraction governor of `url`'s host.
+    """
+    if entries is None:
+        return
+    stop = offset + limit if limit is not None else None
+
+    if hasattr(entries, "getslice"):
+        # PagedList: fetch only the pages covering the requested range
+        start = offset
+        while stop is None or start < stop:
+            end = start + PLAYLIST_PAGE_SIZE if stop is None else min(start + PLAYLIST_PAGE_SIZE, stop)
+            page = governor.call(url, entries.getslice, start, end)
+            if not page:
+                return
+            for i, entry in enumerate(page):
+                yield start + i, entry
+            if len(page) < end - start:
+                return
+            start = end
+        return
+
+    # Generators can't be rewound, so a 429 here backs the host off but isn't retried
+    entries = itertools.islice(entries, offset, stop)
+    index = offset
+    while True:
+        with governor.slot(url) as host:
+            try:
+                page = list(itertools.islice(entries, PLAYLIST_PAGE_SIZE))
+            except Exception as e:
+                governor.report_error(host, e)
+                raise
+        for entry in page:
+            yield index, entry
+            index += 1
+        if len(page) < PLAYLIST_PAGE_SIZE:
+            return
+
+
 
 @app.route('/thumbnails/<path:filename>')
 def serve_thumbnail(filename):
-    return send_from_directory("thumbnails", filename)
+    # File names are per task and never rewritten, so browsers may keep them for good
+    response = send_from_directory("thumbnails", filename, max_age=THUMBNAIL_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
 
 
 
@@ -350,38 +591,44 @@ def stream_thumbnails():
             }
 
         ydl_opts = {'quiet': True}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            for task_id, task in video_tasks.items():
-                try:
-                    info = ydl.extract_info(task["url"], download=False)
+        for task_id, task in video_tasks.items():
+            try:
+                thumb_url = task.get("thumbnail")  # known from detection, no extraction needed
+                if not thumb_url:
+                    with ydl_pool.checkout("thumbnails", ydl_opts) as ydl:
+                        info = governor.call(task["url"], ydl.extract_info, task["url"], download=False)
+                        store_info(ydl, task["url"], info)
                     thumb_url = info.get("thumbnail")
-                    if thumb_url:
-                        ext = os.path.splitext(thumb_url.split("?")[0])[1]
-                        filename = f"{task_id}{ext}"
-                        path = os.path.join("thumbnails", filename)
-
-                        # 🔧 Check if file already exists before re-downloading
-                        if not os.path.exists(path):
-                            r = requests.get(thumb_url, timeout=5)
-                            if r.status_code == 200:
-                                with open(path, "wb") as f:
-                                    f.write(r.content)
-
+                if thumb_url:
+                    # 🔧 Reuses the file if it already exists
+                    path = download_thumbnail(thumb_url, task_id)
+                    if path:
                         with task_lock:
                             tasks[task_id]["thumbnail_path"] = path
                             save_tasks()
 
-                        yield f'data: {json.dumps({"id": task_id, "thumbnail": f"/thumbnails/{filename}"})}\n\n'
+                        yield f'data: {json.dumps({"id": task_id, "thumbnail": get_thumbnail_url(path)})}\n\n'
                         time.sleep(0.1)
 
-                except Exception:
-                    continue
+            except Exception:
+                continue
 
         yield "event: done\ndata: end\n\n"
 
     return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 
+@app.route('/pool-stats')
+def pool_stats():
+    stats = {"ydl_pool": ydl_pool.stats(), "resume": resume_admitter.stats(), "governor": governor.stats(),
+             "thumbnail_governor": thumbnail_governor.stats(),
+             "disk": disk_admission.stats()}
+    if WORKER_MODE:
+        from worker_bridge import stats as worker_stats
+        stats["workers"] = worker_stats()
+    return jsonify(stats)
+
+
 @app.route('/pause_all', methods=['POST'], endpoint='pause_all_tasks_endpoint')
 def pause_all_tasks():
     with task_lock:
@@ -397,16 +644,16 @@ def pause_all_tasks():
 @app.route('/resume_all', methods=['POST'], endpoint='resume_all_tasks_unique_endpoint')
 def resume_all_tasks_unique():
     with task_lock:
+        resumed = []
         for task_id, task in tasks.items():
             if task.get("status") == 'paused':
                 task['paused'] = False
                 task['should_abort'] = False
-                task['status'] = 'queued'
-        save_tasks()
-    threading.Thread(target=start_next_queued_task, daemon=True).start()
+                resumed.append(task_id)
+    resume_admitter.submit(resumed)
     return jsonify({"success": True, "message": "All tasks resumed."})
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=3458, threaded=True)
+    serve('0.0.0.0', 3458)
 
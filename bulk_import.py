@@ -0,0 +1,135 @@
+"""📥 Bulk import of newline-delimited URL lists.
+
+Through a running server (streams the file to POST /import):
+
+    python bulk_import.py urls.txt --quality 720 --format video
+
+Or straight into tasks.json while the app is stopped (resumed on next start):
+
+    python bulk_import.py urls.txt --offline
+"""
+import sys
+import time
+import uuid
+import argparse
+from urllib.parse import urlparse, parse_qs
+
+from task_store import tasks, task_lock, add_tasks
+from settings import IMPORT_BATCH_SIZE
+
+VALID_FORMATS = ("video", "audio", "playlist")
+
+
+def url_key(url):
+    """🔑 Dedupe key: the video id for YouTube watch/short links, else the URL itself"""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.endswith("youtu.be"):
+        return "yt:" + parsed.path.strip("/")
+    if host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            video_id = parse_qs(parsed.query).get("v", [None])[0]
+            if video_id:
+                return "yt:" + video_id
+        if parsed.path.startswith("/shorts/"):
+            return "yt:" + parsed.path.split("/")[2]
+    return url
+
+
+def iter_lines(binary_stream, encoding="utf-8"):
+    """📜 Decode a binary stream line by line without reading it all"""
+    for raw in binary_stream:
+        yield raw.decode(encoding, errors="replace") if isinstance(raw, bytes) else raw
+
+
+def iter_unique_urls(lines, stats, seen):
+    """🧹 Yield valid, not-yet-seen URLs; blank lines and # comments are skipped"""
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        if not url.startswith(("http://", "https://")):
+            stats["invalid"] += 1
+            continue
+        key = url_key(url)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        yield url
+
+
+def import_urls(lines, quality="720", fmt="video", batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    """📦 Create queued tasks from URL lines, one persistence write per batch.
+
+    `on_batch(task_ids)` hands every stored batch to the scheduler.
+    """
+    stats = {"imported": 0, "duplicates": 0, "invalid": 0, "batches": 0}
+    with task_lock:
+        seen = {url_key(t["url"]) for t in tasks.values() if t.get("url")}
+
+    batch = []
+    for url in iter_unique_urls(lines, stats, seen):
+        task_id = uuid.uuid4().hex[:8]
+        batch.append({
+            'id': task_id,
+            'url': url,
+            'type': fmt,
+            'quality': quality,
+            'format': fmt,
+            'title': url,
+            'status': 'queued',
+            'created_at': time.time()
+        })
+        if len(batch) >= batch_size:
+            _flush(batch, stats, on_batch)
+            batch = []
+    if batch:
+        _flush(batch, stats, on_batch)
+    return stats
+
+
+def _flush(batch, stats, on_batch):
+    add_tasks(batch)
+    stats["imported"] += len(batch)
+    stats["batches"] += 1
+    if on_batch:
+        on_batch([t["id"] for t in batch])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue downloads from a file with one URL per line.")
+    parser.add_argument("file", help="URL list ('-' for stdin)")
+    parser.add_argument("--quality", default="720")
+    parser.add_argument("--format", default="video", choices=VALID_FORMATS)
+    parser.add_argument("--server", default="http://127.0.0.1:3458",
+                        help="running app to import into (python app.py; run_app.py serves on port 3452)")
+    parser.add_argument("--offline", action="store_true", help="write to tasks.json directly (app must be stopped)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    with source:
+        if args.offline:
+            from task_store import load_tasks
+            load_tasks()
+            stats = import_urls(iter_lines(source), args.quality, args.format, args.batch_size)
+        else:
+            import requests
+            r = requests.post(
+                f"{args.server.rstrip('/')}/import",
+                params={"quality": args.quality, "format": args.format, "batch_size": args.batch_size},
+                data=source,
+                headers={"Content-Type": "text/plain"}
+            )
+            if r.status_code != 200:
+                print(f"[ERROR] Import failed ({r.status_code}): {r.text}")
+                sys.exit(1)
+            stats = r.json()
+
+    print(f"✅ Imported {stats['imported']} URLs "
+          f"({stats['duplicates']} duplicates, {stats['invalid']} invalid skipped).")
+
+
+if __name__ == '__main__':
+    main()
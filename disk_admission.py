@@ -0,0 +1,181 @@
+import os
+import time
+import shutil
+from threading import Thread
+
+from task_store import tasks, save_tasks, task_lock
+from settings import DISK_RESERVE_BYTES, DISK_RECHECK_SECONDS
+
+HOLD_LABEL = "Waiting for disk space"
+ACTIVE_STATUSES = ("running", "processing")
+
+
+class DiskSpaceHeld(Exception):
+    """💽 Raised inside a download once its task has been put on hold"""
+
+
+def expected_size(info):
+    """📏 Bytes of the formats yt-dlp selected, or None if any size is unknown"""
+    if not info:
+        return None
+    total = 0
+    for fmt in info.get("requested_formats") or [info]:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size:
+            return None
+        total += size
+    return int(total)
+
+
+def select_formats(ydl, info):
+    """🎚️ Re-run format selection on a processed info_dict with `ydl`'s own options (no download)"""
+    info = ydl.sanitize_info(info, remove_private_keys=True)  # drops requested_formats
+    if info.get("formats"):
+        # Top-level sizes belong to the format selected when the info was extracted
+        info.pop("filesize", None)
+        info.pop("filesize_approx", None)
+    return ydl.process_ie_result(info, download=False)
+
+
+def _existing(path):
+    """📂 Nearest existing directory, so a missing ~/Downloads still maps to its filesystem"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class DiskAdmission:
+    """💽 Holds downloads whose expected size won't fit on the temp/final filesystems"""
+
+    def __init__(self, temp_dir, final_dir, reserve=DISK_RESERVE_BYTES):
+        self.temp_dir = temp_dir
+        self.final_dir = final_dir
+        self.reserve = max(0, reserve)
+        self.recheck_thread = None
+        # Worker processes set this to reserve space through the shared broker:
+        # shared(task_id, expected, check) -> hold reason or None
+        self.shared = None
+
+    def _needs(self, expected, downloaded=0):
+        """🧮 Bytes a download still has to write, per filesystem (st_dev)"""
+        temp_dev = os.stat(_existing(self.temp_dir)).st_dev
+        final_dev = os.stat(_existing(self.final_dir)).st_dev
+        # Parts and the merged/converted output sit side by side in temp
+        needs = {temp_dev: max(0, expected - downloaded) + expected}
+        if final_dev != temp_dev:
+            needs[final_dev] = expected  # the final move copies across filesystems
+        return needs
+
+    def shortfall(self, task_id, expected, downloaded=0, others=()):
+        """🔍 Why `expected` bytes won't fit next to the running downloads (None if they do).
+
+        `others` adds (expected, downloaded) pairs running outside this process.
+        Call with task_lock held.
+        """
+        running = [(t["expected_bytes"], t.get("downloaded_bytes", 0)) for t in tasks.values()
+                   if t["id"] != task_id and t.get("status") in ACTIVE_STATUSES and t.get("expected_bytes")]
+        reserved = {}
+        for other_expected, other_downloaded in running + list(others):
+            for dev, size in self._needs(other_expected, other_downloaded or 0).items():
+                reserved[dev] = reserved.get(dev, 0) + size
+
+        needs = self._needs(expected, downloaded)
+        for path in (self.temp_dir, self.final_dir):
+            path = _existing(path)
+            dev = os.stat(path).st_dev
+            need = needs.pop(dev, None)
+            if need is None:
+                continue
+            free = shutil.disk_usage(path).free - self.reserve - reserved.get(dev, 0)
+            if need > free:
+                return f"needs {format_bytes(need)} on {path}, {format_bytes(max(0, free))} available"
+        return None
+
+    def hold(self, task, reason):
+        """⏸️ Park a task until space frees up. Call with task_lock held."""
+        task["status"] = "held"
+        task["progress"] = HOLD_LABEL
+        task["hold_reason"] = reason
+        print(f"[{task['id']}] 💽 Held: {reason}")
+
+    def admit(self, task_id, info):
+        """✅ Record the task's expected size; hold it (returns False) if it won't fit"""
+        expected = expected_size(info)
+        with task_lock:
+            task = tasks.get(task_id)
+            if not task:
+                return True
+            task["expected_bytes"] = expected
+            if not expected:
+                return True  # unknown size: nothing to judge by
+            if self.shared:
+                reason = self.shared(task_id, expected,
+                                     lambda others: self.shortfall(task_id, expected, others=others))
+            else:
+                reason = self.shortfall(task_id, expected)
+            if reason:
+                self.hold(task, reason)
+                save_tasks()
+                return False
+        return True
+
+    def check_start(self, task):
+        """🚪 Re-check a task with a known size before it starts. Call with task_lock held."""
+        expected = task.get("expected_bytes")
+        if not expected:
+            return True
+        reason = self.shortfall(task["id"], expected, task.get("downloaded_bytes", 0))
+        if reason:
+            self.hold(task, reason)
+            return False
+        task.pop("hold_reason", None)
+        return True
+
+    def release_held(self):
+        """🔓 Queue held tasks that fit now. Call with task_lock held; returns how many."""
+        released = 0
+        for task in tasks.values():
+            if task.get("status") != "held" or task.get("paused"):
+                continue
+            if self.shortfall(task["id"], task.get("expected_bytes") or 0, task.get("downloaded_bytes", 0)) is None:
+                task["status"] = "queued"
+                task["progress"] = "0%"
+                task.pop("hold_reason", None)
+                released += 1
+        return released
+
+    def recheck_loop(self):
+        """🔁 Space can also free up outside the app, so retry held tasks now and then"""
+        from download_manager import start_next_queued_task
+
+        while True:
+            time.sleep(DISK_RECHECK_SECONDS)
+            try:
+                with task_lock:
+                    has_held = any(t.get("status") == "held" for t in tasks.values())
+                if has_held:
+                    start_next_queued_task()
+            except Exception as e:
+                print(f"[Disk Warning] {e}")
+
+    def start_recheck(self):
+        if self.recheck_thread is None or not self.recheck_thread.is_alive():
+            self.recheck_thread = Thread(target=self.recheck_loop, daemon=True)
+            self.recheck_thread.start()
+
+    def stats(self):
+        usage = {}
+        for path in (self.temp_dir, self.final_dir):
+            usage[path] = shutil.disk_usage(_existing(path)).free
+        with task_lock:
+            held = sum(1 for t in tasks.values() if t.get("status") == "held")
+        return {"free_bytes": usage, "reserve_bytes": self.reserve, "held": held}
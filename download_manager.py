@@ -1,20 +1,27 @@
 
 import os
-import yt_dlp
 
 import shutil
 import glob
-import requests
+import time
 from pathlib import Path
 from threading import Thread
 import threading
 
-from task_store import tasks, save_tasks, task_lock
+from task_store import tasks, save_tasks, task_lock, refresh_playlist, TaskRecord
+from info_cache import load_info, discard_info, store_info
+from ydl_pool import ydl_pool, get_http_session
+from settings import WORKER_MODE, DOWNLOAD_BUFFER_SIZE, HTTP_CHUNK_SIZE
+from disk_admission import DiskAdmission, DiskSpaceHeld, select_formats
+from extraction_governor import governor, thumbnail_governor, ThrottledError
 from utils import (
     get_output_template,
     get_format_string,
     get_postprocessors,
-    generate_progress_hook
+    generate_progress_hook,
+    create_thumbnail_variant,
+    get_thumbnail_variant_path,
+    max_running_tasks
 )
 
 
@@ -24,6 +31,7 @@ downloads_dir = str(Path.home() / "Downloads")
 temp_dir = os.path.join(os.getcwd(), "temp_downloads")
 os.makedirs(temp_dir, exist_ok=True)
 os.makedirs("thumbnails", exist_ok=True)
+disk_admission = DiskAdmission(temp_dir, downloads_dir)
 
 
 def delete_temp_files(task_id, base_path):
@@ -52,28 +60,102 @@ def download_thumbnail(thumbnail_url, task_id):
         if os.path.exists(path):
             return path
 
-        r = requests.get(thumbnail_url, timeout=5)
+        def fetch():
+            response = get_http_session().get(thumbnail_url, timeout=5)
+            if response.status_code == 429:
+                raise ThrottledError(thumbnail_url, response.headers.get("Retry-After"))
+            return response
+
+        r = thumbnail_governor.call(thumbnail_url, fetch)
         if r.status_code == 200:
             with open(path, "wb") as f:
                 f.write(r.content)
+            create_thumbnail_variant(path)
             return path
     except Exception as e:
         print(f"[Thumbnail Warning] {e}")
     return None
 
 
+def fetch_thumbnails_later(pending):
+    """🖼️ Download (task_id, thumbnail_url) pairs in the background, off the request path"""
+    def run():
+        fetched = False
+        for task_id, thumbnail_url in pending:
+            path = download_thumbnail(thumbnail_url, task_id)
+            if not path:
+                continue
+            with task_lock:
+                task = tasks.get(task_id)
+                if task:
+                    task["thumbnail_path"] = path
+                    fetched = True
+                    continue
+            # Deleted meanwhile: don't leave the files behind
+            for leftover in (path, get_thumbnail_variant_path(path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        if fetched:
+            save_tasks()
+
+    if pending:
+        Thread(target=run, daemon=True).start()
+
+
 def check_abort(task_id):
+    import yt_dlp
+
     with task_lock:
         task = tasks.get(task_id)
         if task and (task.get("should_abort") or task.get("paused")):
             raise yt_dlp.utils.DownloadCancelled()
 
 
+def download_from_info(ydl, task_id, info_ref):
+    """♻️ Start a download from a previously extracted info_dict (info-JSON path)"""
+    import yt_dlp
+
+    cached = load_info(info_ref)
+    if not cached:
+        print(f"[{task_id}] ⌛ Cached info expired, re-extracting.")
+        discard_info(info_ref)
+        return None
+
+    try:
+        print(f"[{task_id}] ♻️ Reusing extracted info.")
+        # Sized by this download's format/quality, not by what detection selected
+        if not disk_admission.admit(task_id, select_formats(ydl, cached)):
+            raise DiskSpaceHeld()
+        info = ydl.process_ie_result(ydl.sanitize_info(cached), download=True)
+        if info:
+            temp_file = os.path.splitext(ydl.prepare_filename(info))[0]
+            ext = info.get("ext")
+            if any(os.path.exists(f"{temp_file}.{e}") for e in (ext, "mp4", "mp3")):
+                return info
+        raise Exception("nothing downloaded from cached info")
+    except (yt_dlp.utils.DownloadCancelled, DiskSpaceHeld):
+        raise
+    except Exception as e:
+        print(f"[{task_id}] ⚠️ Cached info failed ({e}), re-extracting.")
+        discard_info(info_ref)
+        with task_lock:
+            task = tasks.get(task_id)
+            if task:
+                task.pop("info_ref", None)
+        return None
+
+
 def start_next_queued_task():
+    from resume_admission import resume_admitter
+
     with task_lock:
+        if disk_admission.release_held():
+            save_tasks()
         running_count = sum(1 for t in tasks.values() if t.get("status") == "running")
-        available_slots = max(0, 4 - running_count)
-        queued_tasks = [t for t in tasks.values() if t.get("status") == "queued"]
+        available_slots = max(0, max_running_tasks() - running_count)
+        # Tasks waiting in the resume admitter are started by it, at its pace
+        queued_tasks = [t for t in tasks.values()
+                        if t.get("status") == "queued" and not resume_admitter.owns(t["id"])]
 
         for task in queued_tasks[:available_slots]:
             task_id = task["id"]
@@ -84,6 +166,7 @@ def start_next_queued_task():
                 args=(task_id, task["url"], task["quality"], task["format"]),
                 daemon=True
             ).start()
+    resume_admitter.wake()
 
 
 def enqueue_download(task_id, video_url, quality, fmt):
@@ -91,99 +174,250 @@ def enqueue_download(task_id, video_url, quality, fmt):
     enqueue_custom_download(task_id, video_url, quality, fmt)
 
 
-def enqueue_custom_download(task_id, video_url, quality, fmt):
+def _call_once(callback):
+    """🔂 Wrap a callback so only its first invocation runs"""
+    called = threading.Event()
+
+    def wrapper(*_):
+        if callback and not called.is_set():
+            called.set()
+            callback()
+    return wrapper
+
+
+def run_download(task_id, video_url, quality, fmt, on_extracted=None):
+    """🎥 Download one task synchronously (thread body, also used by worker processes)"""
+    extracted = _call_once(on_extracted)
+    try:
+        _download(task_id, video_url, quality, fmt, extracted)
+    finally:
+        extracted()
+
+
+def expand_playlist(task_id, playlist_url, quality):
+    """🧩 Turn a playlist task into one queued child task per entry"""
+    try:
+        with ydl_pool.checkout("playlist", {'quiet': True, 'extract_flat': True}) as ydl:
+            info = governor.call(playlist_url, ydl.extract_info, playlist_url, download=False)
+        if not info:
+            raise Exception("No info extracted")
+    except Exception as e:
+        print(f"[{task_id}] ❌ Playlist expansion failed: {e}")
+        with task_lock:
+            task = tasks.get(task_id)
+            if task:
+                task["status"] = "failed"
+                task["progress"] = "Error"
+                save_tasks()
+        start_next_queued_task()
+        return
+
+    entries = [e for e in (info.get("entries") or []) if e] if info.get("_type") == "playlist" else [info]
+
     with task_lock:
-        running_count = sum(1 for t in tasks.values() if t.get("status") == "running")
-        task = tasks.get(task_id)
-        if not task:
+        parent = tasks.get(task_id)
+        if not parent or parent.get("should_abort"):
+            print(f"[{task_id}] 🚩 Aborted before expansion.")
             return
 
-        if running_count >= 4:
-            task["status"] = "queued"
-            save_tasks()
-            return
-        else:
-            task["status"] = "running"
-            save_tasks()
+        children = []
+        for index, entry in enumerate(entries, start=1):
+            child_id = f"{task_id}-{index}"
+            url = entry.get("url") or entry.get("webpage_url")
+            if not url:
+                continue
+            tasks[child_id] = TaskRecord(
+                id=child_id,
+                url=url,
+                type='video',
+                quality=quality,
+                format='video',
+                title=entry.get("title") or url,
+                status='queued',
+                parent_id=task_id,
+                playlist_index=index,
+                created_at=time.time()
+            )
+            children.append(child_id)
+
+        parent["children"] = children
+        parent["status"] = "expanded"
+        parent["progress"] = "0%"
+        if info.get("title"):
+            parent["title"] = info["title"]
+        save_tasks()
+
+    print(f"[{task_id}] 🧩 Expanded playlist into {len(children)} tasks.")
+    refresh_playlist(task_id)
+    start_next_queued_task()
+
+
+def _download(task_id, video_url, quality, fmt, extracted):
+    if fmt == 'playlist':
+        expand_playlist(task_id, video_url, quality)
+        return
+
+    ext = 'mp3' if fmt == 'audio' else 'mp4'
+    temp_output_template = get_output_template(temp_dir, fmt)
+    base_template = os.path.splitext(temp_output_template)[0]
+
+    ydl_opts = {
+        'format': get_format_string(quality, fmt),
+        'outtmpl': temp_output_template,
+        'merge_output_format': ext,
+        'continuedl': True,
+        'ignoreerrors': 'only_download',  # extraction errors (e.g. 429) must surface
+        'retries': 10,
+        'fragment_retries': 10,
+        'noplaylist': True,
+        'postprocessors': get_postprocessors(fmt),
+        'quiet': True,
+        'nopart': False,
+        'concurrent_fragment_downloads': 1
+    }
+    if DOWNLOAD_BUFFER_SIZE > 0:
+        # Fewer, bigger writes, but progress hooks (pause/abort) only run once per buffer
+        ydl_opts['buffersize'] = DOWNLOAD_BUFFER_SIZE
+        ydl_opts['noresizebuffer'] = True
+    if HTTP_CHUNK_SIZE > 0:
+        ydl_opts['http_chunk_size'] = HTTP_CHUNK_SIZE
+
+    try:
+        with task_lock:
+            task = tasks.get(task_id)
+            if not task or task.get("should_abort"):
+                print(f"[{task_id}] 🚩 Aborted before start.")
+                delete_temp_files(task_id, base_template)
+                start_next_queued_task()  # 🔁 Trigger next download
+                return
+
+        with task_lock:
+            task = tasks.get(task_id)
+            info_ref = task.get("info_ref") if task else None
+
+        with ydl_pool.checkout(
+            "download", ydl_opts,
+            progress_hooks=[extracted, generate_progress_hook(task_id)],
+            postprocessor_hooks=[lambda d: check_abort(task_id)],
+            max_in_use=max_running_tasks()
+        ) as ydl:
+            print(f"[{task_id}] 🎥 Downloading...")
+            info = None
+            try:
+                if info_ref:
+                    info = download_from_info(ydl, task_id, info_ref)
+
+                if not info:
+                    # Metadata goes through the governor; the media download itself doesn't
+                    extracted_info = governor.call(video_url, ydl.extract_info, video_url, download=False)
+                    extracted()
+                    if extracted_info:
+                        ref = store_info(ydl, video_url, extracted_info)
+                        with task_lock:
+                            task = tasks.get(task_id)
+                            if task and ref:
+                                task["info_ref"] = ref
+                        if not disk_admission.admit(task_id, extracted_info):
+                            raise DiskSpaceHeld()
+                        info = ydl.process_ie_result(ydl.sanitize_info(extracted_info), download=True)
+            except DiskSpaceHeld:
+                start_next_queued_task()  # 🔁 Trigger next download
+                return
+
+            if not info:
+
+                raise Exception("No info extracted")
+
+            base = os.path.splitext(ydl.prepare_filename(info))[0]
+            temp_file = f"{base}.{ext}"
 
-    def download():
-        ext = 'mp3' if fmt == 'audio' else 'mp4'
-        temp_output_template = get_output_template(temp_dir, fmt)
-        base_template = os.path.splitext(temp_output_template)[0]
-
-        ydl_opts = {
-            'format': get_format_string(quality, fmt),
-            'outtmpl': temp_output_template,
-            'merge_output_format': ext,
-            'continuedl': True,
-            'ignoreerrors': True,
-            'retries': 10,
-            'fragment_retries': 10,
-            'noplaylist': (fmt != 'playlist'),
-            'progress_hooks': [generate_progress_hook(task_id)],
-            'postprocessor_hooks': [lambda d: check_abort(task_id)],
-            'postprocessors': get_postprocessors(fmt),
-            'quiet': True,
-            'nopart': False,
-            'concurrent_fragment_downloads': 1
-        }
-
-        try:
             with task_lock:
                 task = tasks.get(task_id)
-                if not task or task.get("should_abort"):
-                    print(f"[{task_id}] 🚩 Aborted before start.")
-                    delete_temp_files(task_id, base_template)
+                if not task or task.get("should_abort") or task.get("status") == "deleted":
+                    print(f"[{task_id}] ❌ Aborted mid-download.")
+                    delete_temp_files(task_id, base)
                     start_next_queued_task()  # 🔁 Trigger next download
                     return
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                print(f"[{task_id}] 🎥 Downloading...")
-                info = ydl.extract_info(video_url, download=True)
+            base_name = os.path.splitext(os.path.basename(base))[0]
+            final_path = os.path.join(downloads_dir, f"{base_name}.{ext}")
+            counter = 1
+            while os.path.exists(final_path):
+                final_path = os.path.join(downloads_dir, f"{base_name}_{counter}.{ext}")
+                counter += 1
+
+            shutil.move(temp_file, final_path)
+            print(f"[{task_id}] ✅ Download completed: {final_path}")
 
-                if not info:
-                
-                    raise Exception("No info extracted")
-
-                base = os.path.splitext(ydl.prepare_filename(info))[0]
-                temp_file = f"{base}.{ext}"
-
-                with task_lock:
-                    task = tasks.get(task_id)
-                    if not task or task.get("should_abort") or task.get("status") == "deleted":
-                        print(f"[{task_id}] ❌ Aborted mid-download.")
-                        delete_temp_files(task_id, base)
-                        start_next_queued_task()  # 🔁 Trigger next download
-                        return
-
-                base_name = os.path.splitext(os.path.basename(base))[0]
-                final_path = os.path.join(downloads_dir, f"{base_name}.{ext}")
-                counter = 1
-                while os.path.exists(final_path):
-                    final_path = os.path.join(downloads_dir, f"{base_name}_{counter}.{ext}")
-                    counter += 1
-
-                shutil.move(temp_file, final_path)
-                print(f"[{task_id}] ✅ Download completed: {final_path}")
-
-                with task_lock:
-                    task = tasks.get(task_id)
-                    if task:
-                        task["status"] = "completed"
-                        task["progress"] = "100%"
-                        task["final_path"] = final_path
-                        save_tasks()
-
-        except Exception as e:
-            print(f"[{task_id}] ❌ Download failed: {e}")
-            delete_temp_files(task_id, base_template)
             with task_lock:
                 task = tasks.get(task_id)
                 if task:
-                    task["status"] = "failed"
-                    task["progress"] = "Error"
+                    task["status"] = "completed"
+                    task["progress"] = "100%"
+                    task["final_path"] = final_path
+                    task["finished_at"] = time.time()
+                    discard_info(task.pop("info_ref", None))  # not needed once downloaded
                     save_tasks()
+                    if task.get("parent_id"):
+                        refresh_playlist(task["parent_id"])
+
+    except Exception as e:
+        print(f"[{task_id}] ❌ Download failed: {e}")
+        delete_temp_files(task_id, base_template)
+        with task_lock:
+            task = tasks.get(task_id)
+            if task:
+                task["status"] = "failed"
+                task["progress"] = "Error"
+                task["finished_at"] = time.time()
+                save_tasks()
+                if task.get("parent_id"):
+                    refresh_playlist(task["parent_id"])
+
+    start_next_queued_task()  # ✅ Always trigger next download
+
+
+def enqueue_custom_download(task_id, video_url, quality, fmt, on_extracted=None):
+    """▶️ Start a download thread if a slot is free; returns whether it started.
+
+    `on_extracted` is called once the extraction phase is over (first progress
+    tick, or the thread finishing), or right away if the task is not started.
+    """
+    with task_lock:
+        task = tasks.get(task_id)
+        # The task itself may already be marked running by start_next_queued_task
+        running_count = sum(1 for t in tasks.values() if t.get("status") == "running" and t is not task)
+        if not task:
+            if on_extracted:
+                on_extracted()
+            return False
 
-        start_next_queued_task()  # ✅ Always trigger next download
+        if running_count >= max_running_tasks():
+            task["status"] = "queued"
+            save_tasks()
+            if on_extracted:
+                on_extracted()
+            return False
+        elif not disk_admission.check_start(task):
+            save_tasks()
+            if on_extracted:
+                on_extracted()
+            return False
+        else:
+            task["status"] = "running"
+            save_tasks()
 
-    Thread(target=download, daemon=True).start()
+    if WORKER_MODE and fmt != 'playlist':
+        # Playlists expand here, their children go to the workers
+        from worker_bridge import submit_job
+        submit_job(task_id, video_url, quality, fmt)
+        if on_extracted:
+            on_extracted()  # extraction happens in the worker process
+        return True
+
+    Thread(
+        target=run_download,
+        args=(task_id, video_url, quality, fmt, on_extracted),
+        daemon=True
+    ).start()
+    return True
@@ -0,0 +1,208 @@
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from threading import Condition
+from urllib.parse import urlparse
+
+from settings import (
+    GOVERNOR_MAX_CONCURRENT_PER_HOST,
+    GOVERNOR_RATE_PER_HOST,
+    GOVERNOR_BACKOFF_BASE,
+    GOVERNOR_BACKOFF_MAX,
+    GOVERNOR_MAX_RETRIES,
+    THUMBNAIL_MAX_CONCURRENT_PER_HOST,
+    THUMBNAIL_RATE_PER_HOST
+)
+
+# Hosts that are really the same service, so they share limits and backoff
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "music.youtube.com": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+}
+
+
+class ThrottledError(Exception):
+    """🚦 Raised for HTTP 429 responses that didn't come with an exception of their own"""
+
+    def __init__(self, url, retry_after=None):
+        super().__init__(f"HTTP Error 429: Too Many Requests ({url})")
+        self.retry_after = retry_after
+
+
+def host_for(url):
+    """🌐 Normalized host used as the governor key"""
+    host = (urlparse(url or "").netloc or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return HOST_ALIASES.get(host, host) or "unknown"
+
+
+def _exc_chain(exc):
+    """🔗 The exception and everything it wraps (yt-dlp exc_info/cause, __cause__, __context__)"""
+    seen = set()
+    pending = [exc]
+    while pending:
+        exc = pending.pop(0)
+        if exc is None or id(exc) in seen or not isinstance(exc, BaseException):
+            continue
+        seen.add(id(exc))
+        yield exc
+        exc_info = getattr(exc, "exc_info", None)
+        pending.extend([exc_info[1] if exc_info else None, getattr(exc, "cause", None),
+                        exc.__cause__, exc.__context__])
+
+
+def is_throttled(exc):
+    """🔍 Recognize 429s from requests, yt-dlp errors (and the errors they wrap)"""
+    for err in _exc_chain(exc):
+        if isinstance(err, ThrottledError):
+            return True
+        status = getattr(err, "status", None) or getattr(getattr(err, "response", None), "status_code", None)
+        if status == 429:
+            return True
+        text = str(err)
+        if "HTTP Error 429" in text or "Too Many Requests" in text:
+            return True
+    return False
+
+
+def _parse_retry_after(value):
+    """Retry-After is either seconds or an HTTP date"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _retry_after(exc):
+    for err in _exc_chain(exc):
+        value = getattr(err, "retry_after", None)
+        if value is None:
+            response = getattr(err, "response", None)
+            headers = getattr(response, "headers", None) or getattr(err, "headers", None) or {}
+            value = headers.get("Retry-After")
+        if value is not None:
+            delay = _parse_retry_after(value)
+            if delay is not None:
+                return delay
+    return None
+
+
+class _HostState:
+    def __init__(self):
+        self.active = 0
+        self.waiting = 0
+        self.next_slot = 0.0
+        self.backoff_until = 0.0
+        self.streak = 0
+        self.calls = 0
+        self.throttled = 0
+
+
+class ExtractionGovernor:
+    """🚦 Per-host concurrency and rate limits with shared 429 backoff"""
+
+    def __init__(self, max_concurrent=GOVERNOR_MAX_CONCURRENT_PER_HOST, rate=GOVERNOR_RATE_PER_HOST,
+                 backoff_base=GOVERNOR_BACKOFF_BASE, backoff_max=GOVERNOR_BACKOFF_MAX,
+                 max_retries=GOVERNOR_MAX_RETRIES):
+        self.max_concurrent = max(1, max_concurrent)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retries = max_retries
+        self.cond = Condition()
+        self.hosts = {}
+
+    def _state(self, host):
+        return self.hosts.setdefault(host, _HostState())
+
+    @contextmanager
+    def slot(self, url):
+        """⏳ Wait for backoff, a concurrency slot and the rate interval of the URL's host"""
+        host = host_for(url)
+        with self.cond:
+            state = self._state(host)
+            state.waiting += 1
+            while True:
+                now = time.monotonic()
+                if now < state.backoff_until:
+                    self.cond.wait(state.backoff_until - now)
+                elif state.active >= self.max_concurrent:
+                    self.cond.wait()
+                elif now < state.next_slot:
+                    self.cond.wait(state.next_slot - now)
+                else:
+                    break
+            state.waiting -= 1
+            state.active += 1
+            state.calls += 1
+            state.next_slot = now + self.interval
+        try:
+            yield host
+        finally:
+            with self.cond:
+                state.active -= 1
+                self.cond.notify_all()
+
+    def call(self, url, fn, *args, **kwargs):
+        """📞 Run `fn` under the host's limits; 429s back off and retry instead of failing"""
+        attempt = 0
+        while True:
+            with self.slot(url) as host:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_throttled(e) or attempt >= self.max_retries:
+                        raise
+                    delay = self.report_throttle(host, _retry_after(e))
+                    print(f"[Governor] 🚦 {host} throttled, backing off {delay:.1f}s (attempt {attempt + 1})")
+                    attempt += 1
+                    continue
+            self.report_success(host)
+            return result
+
+    def report_throttle(self, host, retry_after=None):
+        """🧊 Put every caller of this host on hold; returns the delay"""
+        with self.cond:
+            state = self._state(host)
+            state.throttled += 1
+            state.streak += 1
+            delay = retry_after if retry_after is not None else \
+                min(self.backoff_max, self.backoff_base * 2 ** (state.streak - 1))
+            state.backoff_until = max(state.backoff_until, time.monotonic() + delay)
+            self.cond.notify_all()
+            return delay
+
+    def report_error(self, host, exc):
+        """🧊 Back the host off if `exc` was a 429 (for calls that can't go through call())"""
+        if is_throttled(exc):
+            self.report_throttle(host, _retry_after(exc))
+
+    def report_success(self, host):
+        with self.cond:
+            self._state(host).streak = 0
+
+    def stats(self):
+        now = time.monotonic()
+        with self.cond:
+            return {
+                host: {
+                    "active": s.active,
+                    "waiting": s.waiting,
+                    "calls": s.calls,
+                    "throttled": s.throttled,
+                    "backoff_remaining": round(max(0.0, s.backoff_until - now), 1)
+                }
+                for host, s in self.hosts.items()
+            }
+
+
+governor = ExtractionGovernor()
+thumbnail_governor = ExtractionGovernor(max_concurrent=THUMBNAIL_MAX_CONCURRENT_PER_HOST,
+                                        rate=THUMBNAIL_RATE_PER_HOST, max_retries=0)
@@ -0,0 +1,116 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+from threading import RLock, Thread
+
+from settings import INFO_CACHE_DIR, INFO_CACHE_TTL, INFO_CACHE_PURGE_INTERVAL
+
+cache_lock = RLock()
+url_index = {}  # url -> {"path": ..., "extracted_at": ...}
+
+os.makedirs(INFO_CACHE_DIR, exist_ok=True)
+
+
+def _cache_path(key):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INFO_CACHE_DIR, f"{digest}.info.json.gz")
+
+
+def store_info(ydl, url, info):
+    """💾 Persist an extracted info_dict compactly and index it by URL"""
+    if not url or not info or info.get("_type", "video") != "video":
+        return None
+
+    try:
+        key = info.get("webpage_url") or url
+        path = _cache_path(key)
+        data = ydl.sanitize_info(info)
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        ref = {"path": path, "extracted_at": time.time()}
+        with cache_lock:
+            url_index[url] = ref
+            url_index[key] = ref
+        return ref
+    except Exception as e:
+        print(f"[Info Cache Warning] {e}")
+        return None
+
+
+def lookup_info(url):
+    """🔎 Return the info reference for a URL if it is still fresh"""
+    with cache_lock:
+        ref = url_index.get(url)
+    if ref and is_fresh(ref):
+        return dict(ref)
+    return None
+
+
+def is_fresh(ref):
+    """⏱️ Check that a reference exists on disk and has not expired"""
+    if not ref or not ref.get("path"):
+        return False
+    if time.time() - ref.get("extracted_at", 0) > INFO_CACHE_TTL:
+        return False
+    return os.path.exists(ref["path"])
+
+
+def load_info(ref):
+    """📥 Load a fresh info_dict from its reference, or None"""
+    if not is_fresh(ref):
+        return None
+    try:
+        with gzip.open(ref["path"], "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[Info Cache Warning] Failed to load {ref.get('path')}: {e}")
+        return None
+
+
+def discard_info(ref):
+    """🗑️ Drop a stale or broken reference from the index and disk"""
+    if not ref:
+        return
+    path = ref.get("path")
+    with cache_lock:
+        for url in [u for u, r in url_index.items() if r.get("path") == path]:
+            del url_index[url]
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except Exception as e:
+            print(f"[Info Cache Warning] Failed to delete {path}: {e}")
+
+
+def purge_expired():
+    """🧹 Remove expired cache files from disk"""
+    now = time.time()
+    for name in os.listdir(INFO_CACHE_DIR):
+        path = os.path.join(INFO_CACHE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > INFO_CACHE_TTL:
+                os.remove(path)
+        except Exception:
+            continue
+    with cache_lock:
+        for url in [u for u, r in url_index.items() if not is_fresh(r)]:
+            del url_index[url]
+
+
+def purge_loop():
+    while True:
+        time.sleep(INFO_CACHE_PURGE_INTERVAL)
+        try:
+            purge_expired()
+        except Exception as e:
+            print(f"[Info Cache Warning] {e}")
+
+
+def start_purger():
+    purge_expired()  # leftovers from the previous run
+    Thread(target=purge_loop, daemon=True).start()
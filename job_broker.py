@@ -0,0 +1,196 @@
+import json
+import time
+import sqlite3
+from threading import local
+
+from settings import BROKER_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    task_id    TEXT PRIMARY KEY,
+    payload    TEXT NOT NULL,
+    status     TEXT NOT NULL,       -- pending / claimed / done
+    worker     TEXT,
+    cancel     INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    heartbeat  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS updates (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id    TEXT NOT NULL,
+    fields     TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id  TEXT PRIMARY KEY,
+    seen       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS disk_reservations (
+    task_id    TEXT PRIMARY KEY,
+    host       TEXT NOT NULL,
+    expected   INTEGER NOT NULL,
+    downloaded INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class JobBroker:
+    """📮 SQLite-backed job queue shared by the web process and download workers"""
+
+    def __init__(self, path=BROKER_PATH):
+        self.path = path
+        self.local = local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    # 🌐 Web process side
+
+    def submit(self, task_id, payload):
+        """📤 Queue (or re-queue) a download job"""
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (task_id, payload, status, cancel, created_at) "
+                "VALUES (?, ?, 'pending', 0, ?)",
+                (task_id, json.dumps(payload), time.time())
+            )
+
+    def cancel(self, task_id):
+        """🛑 Ask whichever worker holds the job to stop, or drop it if unclaimed"""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM jobs WHERE task_id = ? AND status = 'pending'", (task_id,))
+            conn.execute("UPDATE jobs SET cancel = 1 WHERE task_id = ?", (task_id,))
+
+    def fetch_updates(self, after_id, limit=500):
+        """📥 Progress reports newer than `after_id`, oldest first"""
+        rows = self._conn().execute(
+            "SELECT id, task_id, fields FROM updates WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [(row_id, task_id, json.loads(fields)) for row_id, task_id, fields in rows]
+
+    def prune_updates(self, upto_id):
+        """🧹 Drop applied progress reports, finished jobs and their disk reservations"""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM updates WHERE id <= ?", (upto_id,))
+            conn.execute("DELETE FROM jobs WHERE status = 'done'")
+            conn.execute(
+                "DELETE FROM disk_reservations WHERE task_id NOT IN "
+                "(SELECT task_id FROM jobs WHERE status = 'claimed')"
+            )
+
+    def requeue_stale(self, timeout):
+        """♻️ Give jobs of workers that stopped heart-beating to someone else"""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'pending', worker = NULL "
+                "WHERE status = 'claimed' AND cancel = 0 AND heartbeat < ?",
+                (time.time() - timeout,)
+            )
+            return cur.rowcount
+
+    def live_workers(self, timeout):
+        """🏭 Workers seen within `timeout` seconds (each runs one job at a time)"""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM workers WHERE seen < ?", (time.time() - timeout,))
+            return conn.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+
+    def stats(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    # 🛠️ Worker side
+
+    def claim(self, worker_id):
+        """🎣 Atomically take the oldest pending job, or None"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._seen(conn, worker_id)
+            row = conn.execute(
+                "SELECT task_id, payload FROM jobs WHERE status = 'pending' "
+                "ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'claimed', worker = ?, heartbeat = ? WHERE task_id = ?",
+                    (worker_id, time.time(), row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        return {"task_id": row[0], **json.loads(row[1])}
+
+    def heartbeat(self, task_id, worker_id, downloaded=0):
+        """💓 Refresh the claim; returns True if the job was cancelled"""
+        with self._conn() as conn:
+            self._seen(conn, worker_id)
+            conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE task_id = ? AND worker = ?",
+                (time.time(), task_id, worker_id)
+            )
+            conn.execute(
+                "UPDATE disk_reservations SET downloaded = ? WHERE task_id = ?",
+                (downloaded or 0, task_id)
+            )
+            row = conn.execute(
+                "SELECT cancel, worker FROM jobs WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        # A missing or re-assigned job counts as cancelled for this worker
+        return not row or bool(row[0]) or row[1] != worker_id
+
+    def _seen(self, conn, worker_id):
+        conn.execute("INSERT OR REPLACE INTO workers (worker_id, seen) VALUES (?, ?)", (worker_id, time.time()))
+
+    def reserve_disk(self, task_id, host, expected, check):
+        """💽 Atomically check and record a job's disk reservation on `host`.
+
+        `check(others)` gets the (expected, downloaded) pairs of the other jobs
+        reserved on the same host and returns a hold reason, or None to reserve.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            others = conn.execute(
+                "SELECT expected, downloaded FROM disk_reservations WHERE host = ? AND task_id != ?",
+                (host, task_id)
+            ).fetchall()
+            reason = check(others)
+            if reason is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO disk_reservations (task_id, host, expected, downloaded) "
+                    "VALUES (?, ?, ?, 0)",
+                    (task_id, host, expected)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return reason
+
+    def report(self, task_id, fields):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO updates (task_id, fields, created_at) VALUES (?, ?, ?)",
+                (task_id, json.dumps(fields), time.time())
+            )
+
+    def finish(self, task_id, worker_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM disk_reservations WHERE task_id = ?", (task_id,))
+            conn.execute(
+                "UPDATE jobs SET status = 'done' WHERE task_id = ? AND worker = ?",
+                (task_id, worker_id)
+            )
@@ -0,0 +1,164 @@
+import time
+import random
+from collections import deque
+from threading import Thread, Condition, BoundedSemaphore
+
+from task_store import tasks, save_tasks, task_lock
+from download_manager import enqueue_custom_download
+from utils import can_start_new_task
+from settings import (
+    RESUME_RAMP_SECONDS,
+    RESUME_START_RATE,
+    RESUME_MAX_RATE,
+    RESUME_JITTER,
+    RESUME_MAX_EXTRACTIONS
+)
+
+
+class ResumeAdmitter:
+    """🐢 Feeds resumed tasks to the downloader at a ramped, jittered pace"""
+
+    def __init__(self, ramp_seconds=RESUME_RAMP_SECONDS, start_rate=RESUME_START_RATE,
+                 max_rate=RESUME_MAX_RATE, jitter=RESUME_JITTER,
+                 max_extractions=RESUME_MAX_EXTRACTIONS):
+        self.ramp_seconds = max(0.0, ramp_seconds)
+        self.start_rate = max(0.01, start_rate)
+        self.max_rate = max(self.start_rate, max_rate)
+        self.jitter = min(max(0.0, jitter), 1.0)
+        self.max_extractions = max(1, max_extractions)
+        self.extraction_slots = BoundedSemaphore(self.max_extractions)
+        self.cond = Condition()
+        self.pending = deque()
+        self.pending_ids = set()
+        self.batch_started = None
+        self.worker = None
+        self.counters = {"submitted": 0, "admitted": 0, "skipped": 0, "extracting": 0}
+
+    def submit(self, task_ids):
+        """📥 Mark tasks as queued (one write) and schedule them for paced admission"""
+        with task_lock:
+            accepted = []
+            changed = False
+            for task_id in task_ids:
+                task = tasks.get(task_id)
+                if not task or task_id in self.pending_ids:
+                    continue
+                if task["status"] != "queued":
+                    task["status"] = "queued"
+                    changed = True
+                accepted.append(task_id)
+            if changed:
+                save_tasks()
+
+        with self.cond:
+            if not self.pending:
+                self.batch_started = time.time()
+            for task_id in accepted:
+                self.pending.append(task_id)
+                self.pending_ids.add(task_id)
+            self.counters["submitted"] += len(accepted)
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = Thread(target=self._run, daemon=True)
+                self.worker.start()
+            self.cond.notify_all()
+        return len(accepted)
+
+    def current_rate(self):
+        """📈 Admissions per second, ramping linearly from start_rate to max_rate"""
+        if not self.ramp_seconds or self.batch_started is None:
+            return self.max_rate
+        progress = min(1.0, (time.time() - self.batch_started) / self.ramp_seconds)
+        return self.start_rate + (self.max_rate - self.start_rate) * progress
+
+    def _next_delay(self):
+        interval = 1.0 / self.current_rate()
+        return max(0.0, interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def owns(self, task_id):
+        """🔒 Whether a queued task is still waiting for paced admission"""
+        with self.cond:
+            return task_id in self.pending_ids
+
+    def wake(self):
+        """🔔 A download slot may have freed up"""
+        with self.cond:
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                delay = self._next_delay()
+
+            time.sleep(delay)
+            self.extraction_slots.acquire()
+
+            with self.cond:
+                task_id = self.pending[0] if self.pending else None
+            if task_id is None:
+                self.extraction_slots.release()
+                continue
+
+            admitted = self._admit(task_id)
+            if admitted is None:
+                # No download slot: keep the task until one frees up (see wake())
+                self.extraction_slots.release()
+                with self.cond:
+                    self.cond.wait(1.0)
+            elif not admitted:
+                self.extraction_slots.release()
+
+    def _release(self, task_id):
+        with self.cond:
+            if task_id in self.pending_ids:
+                self.pending.remove(task_id)
+                self.pending_ids.discard(task_id)
+
+    def _admit(self, task_id):
+        """Start one task; None means it has to wait for a download slot"""
+        with task_lock:
+            task = tasks.get(task_id)
+            if not task or task.get("paused") or task.get("status") != "queued":
+                self._release(task_id)
+                with self.cond:
+                    self.counters["skipped"] += 1
+                return False
+            if not can_start_new_task():
+                return None
+            self._release(task_id)
+            url, quality, fmt = task["url"], task["quality"], task["format"]
+
+        with self.cond:
+            self.counters["admitted"] += 1
+            self.counters["extracting"] += 1
+        # The slot is released by the callback, also when no download slot is free
+        started = enqueue_custom_download(task_id, url, quality, fmt, on_extracted=self._extraction_done)
+        if not started:
+            with task_lock:
+                task = tasks.get(task_id)
+                requeue = task is not None and task.get("status") == "queued" and not task.get("paused")
+            if requeue:
+                # Lost the slot to another start; back to the front of the line
+                with self.cond:
+                    if task_id not in self.pending_ids:
+                        self.pending.appendleft(task_id)
+                        self.pending_ids.add(task_id)
+        return True
+
+    def _extraction_done(self):
+        with self.cond:
+            self.counters["extracting"] -= 1
+        self.extraction_slots.release()
+
+    def stats(self):
+        with self.cond:
+            return {
+                **self.counters,
+                "pending": len(self.pending),
+                "rate": round(self.current_rate(), 3) if self.pending else 0.0,
+                "max_extractions": self.max_extractions
+            }
+
+
+resume_admitter = ResumeAdmitter()
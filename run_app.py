@@ -2,17 +2,11 @@ import subprocess
 import sys
 import threading
 import webbrowser
-import time
-from app import app  # Import your existing Flask app
+from app import bind_server, start_background_init  # Import your existing Flask app
 from task_store import add_task
 import uuid
 
-def run_server():
-    # Start the Flask app on localhost without debug mode
-    app.run(host='127.0.0.1', port=3452, threaded=True)
-
 def open_chrome():
-    time.sleep(1)  # Give server time to start
     url = "http://127.0.0.1:3452"
     
     # Paths to Chrome across different OS
@@ -60,6 +54,8 @@ def add_dummy_tasks():
         add_task(task["id"], task)
 
 if __name__ == '__main__':
-    add_dummy_tasks()
-    threading.Thread(target=run_server).start()
+    # Bind first so the browser can connect immediately; tasks load in the background
+    server = bind_server('127.0.0.1', 3452)
+    start_background_init(after_load=add_dummy_tasks)
+    threading.Thread(target=server.serve_forever).start()
     open_chrome()
@@ -0,0 +1,79 @@
+import os
+
+
+def _env_int(name, default):
+    """🔢 Read an integer setting from the environment"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    """🔢 Read a float setting from the environment"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# 🗂️ Extracted info_dict cache (reused by downloads)
+INFO_CACHE_DIR = os.environ.get("YTD_INFO_CACHE_DIR", "info_cache")
+INFO_CACHE_TTL = _env_int("YTD_INFO_CACHE_TTL", 60 * 60)  # stream URLs expire, keep it short
+INFO_CACHE_PURGE_INTERVAL = _env_int("YTD_INFO_CACHE_PURGE_INTERVAL", 10 * 60)
+
+# ♻️ Pooled YoutubeDL instances and HTTP connections
+YDL_POOL_SIZE = _env_int("YTD_YDL_POOL_SIZE", 4)
+HTTP_POOL_SIZE = _env_int("YTD_HTTP_POOL_SIZE", 8)
+
+# 🐢 Paced resume (startup, resume-all)
+RESUME_RAMP_SECONDS = _env_float("YTD_RESUME_RAMP_SECONDS", 30.0)
+RESUME_START_RATE = _env_float("YTD_RESUME_START_RATE", 0.5)  # admissions per second
+RESUME_MAX_RATE = _env_float("YTD_RESUME_MAX_RATE", 4.0)
+RESUME_JITTER = _env_float("YTD_RESUME_JITTER", 0.3)  # ± fraction of each interval
+RESUME_MAX_EXTRACTIONS = _env_int("YTD_RESUME_MAX_EXTRACTIONS", 2)
+
+# ⬇️ Concurrent downloads (in worker mode: at least one per live worker)
+MAX_CONCURRENT_DOWNLOADS = _env_int("YTD_MAX_CONCURRENT_DOWNLOADS", 4)
+
+# 💾 Progress ticks are written to tasks.json at most this often (state changes right away)
+TASK_SAVE_INTERVAL = _env_float("YTD_TASK_SAVE_INTERVAL", 5.0)
+
+# 🏭 Out-of-process download workers (python worker.py)
+WORKER_MODE = os.environ.get("YTD_WORKER_MODE", "0") == "1"
+BROKER_PATH = os.environ.get("YTD_BROKER_PATH", "jobs.sqlite3")
+BROKER_POLL_SECONDS = _env_float("YTD_BROKER_POLL_SECONDS", 0.5)
+WORKER_STALE_SECONDS = _env_int("YTD_WORKER_STALE_SECONDS", 60)
+
+# 📃 Playlist detection
+PLAYLIST_PAGE_SIZE = _env_int("YTD_PLAYLIST_PAGE_SIZE", 100)
+
+# 🗄️ Archive of finished tasks
+ARCHIVE_DIR = os.environ.get("YTD_ARCHIVE_DIR", "archive")
+ARCHIVE_MAX_AGE = _env_int("YTD_ARCHIVE_MAX_AGE", 7 * 24 * 60 * 60)  # seconds after finishing
+ARCHIVE_INTERVAL = _env_int("YTD_ARCHIVE_INTERVAL", 10 * 60)
+ARCHIVE_SEGMENT_BYTES = _env_int("YTD_ARCHIVE_SEGMENT_BYTES", 4 * 1024 * 1024)
+
+# 🖼️ Thumbnails (long-term cached; other static files always revalidate)
+THUMBNAIL_VARIANT_DIR = os.path.join("thumbnails", "small")
+THUMBNAIL_VARIANT_SIZE = (_env_int("YTD_THUMBNAIL_WIDTH", 200), _env_int("YTD_THUMBNAIL_HEIGHT", 120))
+THUMBNAIL_MAX_AGE = _env_int("YTD_THUMBNAIL_MAX_AGE", 365 * 24 * 60 * 60)
+
+# 🚦 Extraction governor (per-host limits and 429 backoff)
+GOVERNOR_MAX_CONCURRENT_PER_HOST = _env_int("YTD_GOVERNOR_MAX_CONCURRENT", 3)
+GOVERNOR_RATE_PER_HOST = _env_float("YTD_GOVERNOR_RATE", 2.0)  # requests per second
+GOVERNOR_BACKOFF_BASE = _env_float("YTD_GOVERNOR_BACKOFF_BASE", 5.0)
+GOVERNOR_BACKOFF_MAX = _env_float("YTD_GOVERNOR_BACKOFF_MAX", 300.0)
+GOVERNOR_MAX_RETRIES = _env_int("YTD_GOVERNOR_MAX_RETRIES", 6)
+# Thumbnail images come from CDNs: looser limits, and a 429 just skips the image
+THUMBNAIL_MAX_CONCURRENT_PER_HOST = _env_int("YTD_THUMBNAIL_MAX_CONCURRENT", 6)
+THUMBNAIL_RATE_PER_HOST = _env_float("YTD_THUMBNAIL_RATE", 20.0)
+
+# 📥 Bulk URL import
+IMPORT_BATCH_SIZE = _env_int("YTD_IMPORT_BATCH_SIZE", 500)
+
+# 💽 Disk-space admission and write buffering
+DISK_RESERVE_BYTES = _env_int("YTD_DISK_RESERVE_BYTES", 512 * 1024 * 1024)  # always left free
+DISK_RECHECK_SECONDS = _env_int("YTD_DISK_RECHECK_SECONDS", 30)
+DOWNLOAD_BUFFER_SIZE = _env_int("YTD_BUFFER_SIZE", 0)  # 0 = yt-dlp's adaptive default (opt-in: hooks fire once per buffer)
+HTTP_CHUNK_SIZE = _env_int("YTD_HTTP_CHUNK_SIZE", 0)  # 0 = single request per file
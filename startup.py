@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+from threading import Event, Lock
+
+process_started = time.time()
+ready_event = Event()
+phase_lock = Lock()
+phases = []  # [{"name": ..., "started": ..., "seconds": ...}]
+state = {"phase": "starting", "error": None}
+
+
+def record_phase(name, started):
+    """📝 Record a phase that was timed by hand (e.g. module imports)"""
+    with phase_lock:
+        phases.append({
+            "name": name,
+            "started": round(started - process_started, 3),
+            "seconds": round(time.time() - started, 3)
+        })
+
+
+@contextmanager
+def phase(name):
+    """⏱️ Time one startup phase and record it in the breakdown"""
+    started = time.time()
+    with phase_lock:
+        if not ready_event.is_set():
+            state["phase"] = name
+    try:
+        yield
+    except Exception as e:
+        with phase_lock:
+            state["error"] = f"{name}: {e}"
+        raise
+    finally:
+        record_phase(name, started)
+
+
+def mark_ready():
+    """✅ Flag the server as fully initialized"""
+    with phase_lock:
+        state["phase"] = "ready"
+    ready_event.set()
+
+
+def is_ready():
+    return ready_event.is_set()
+
+
+def snapshot():
+    """📊 Readiness state plus the startup-phase timing breakdown"""
+    with phase_lock:
+        return {
+            "ready": ready_event.is_set(),
+            "phase": state["phase"],
+            "error": state["error"],
+            "uptime": round(time.time() - process_started, 3),
+            "phases": list(phases)
+        }
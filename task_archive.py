@@ -0,0 +1,134 @@
+import os
+import json
+import gzip
+import time
+from threading import Lock, Thread
+
+from task_store import tasks, save_tasks, task_lock, delete_task_files
+from settings import ARCHIVE_DIR, ARCHIVE_MAX_AGE, ARCHIVE_INTERVAL, ARCHIVE_SEGMENT_BYTES
+
+FINISHED_STATUSES = ("completed", "failed", "deleted")
+archive_lock = Lock()
+
+os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+
+def list_segments():
+    """📚 Archive segment paths, oldest first"""
+    names = sorted(n for n in os.listdir(ARCHIVE_DIR) if n.startswith("segment-") and n.endswith(".jsonl.gz"))
+    return [os.path.join(ARCHIVE_DIR, n) for n in names]
+
+
+def _current_segment():
+    segments = list_segments()
+    if segments and os.path.getsize(segments[-1]) < ARCHIVE_SEGMENT_BYTES:
+        return segments[-1]
+    number = int(os.path.basename(segments[-1])[8:13]) + 1 if segments else 1
+    return os.path.join(ARCHIVE_DIR, f"segment-{number:05d}.jsonl.gz")
+
+
+def append_records(records):
+    """📦 Append records to the current segment as one new gzip member"""
+    archived_at = time.time()
+    with archive_lock:
+        path = _current_segment()
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps({**record, "archived_at": archived_at},
+                                   separators=(",", ":"), ensure_ascii=False))
+                f.write("\n")
+    return path
+
+
+def archive_finished(max_age=ARCHIVE_MAX_AGE):
+    """🗄️ Move finished tasks older than `max_age` seconds out of the live store"""
+    now = time.time()
+    with task_lock:
+        picked = []
+        stamped = False
+        for task_id, task in tasks.items():
+            if task.get("status") not in FINISHED_STATUSES:
+                continue
+            if task.get("parent_id") in tasks:
+                continue  # archived together with its playlist
+            if not task.get("finished_at"):
+                task["finished_at"] = now  # older records: start their clock now
+                stamped = True
+                continue
+            if now - task["finished_at"] >= max_age:
+                picked.append(task_id)
+                picked.extend(c for c in task.get("children", []) if c in tasks)
+
+        if not picked:
+            if stamped:
+                save_tasks()
+            return 0
+
+        records = []
+        for task_id in picked:
+            record = tasks[task_id].to_dict()
+            # Their files are removed below
+            record.pop("thumbnail_path", None)
+            record.pop("info_ref", None)
+            records.append(record)
+        append_records(records)
+        for task_id in picked:
+            delete_task_files(tasks.pop(task_id))
+        save_tasks()
+
+    print(f"🗄️ Archived {len(picked)} finished tasks.")
+    return len(picked)
+
+
+def search_archive(query=None, status=None, task_id=None, limit=50, offset=0):
+    """🔎 Scan archived tasks (newest segment first) without loading everything"""
+    query = (query or "").lower()
+    results = []
+    skipped = 0
+    has_more = False
+
+    for path in reversed(list_segments()):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                matches = []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if task_id and record.get("id") != task_id:
+                        continue
+                    if status and record.get("status") != status:
+                        continue
+                    if query and query not in (record.get("title") or "").lower() \
+                            and query not in (record.get("url") or "").lower():
+                        continue
+                    matches.append(record)
+        except (OSError, EOFError, ValueError) as e:
+            print(f"[Archive Warning] Failed to read {path}: {e}")
+            continue
+
+        for record in reversed(matches):
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(results) >= limit:
+                has_more = True
+                break
+            results.append(record)
+        if has_more:
+            break
+
+    return {"results": results, "has_more": has_more}
+
+
+def archive_loop():
+    while True:
+        try:
+            archive_finished()
+        except Exception as e:
+            print(f"[Archive Warning] {e}")
+        time.sleep(ARCHIVE_INTERVAL)
+
+
+def start_archiver():
+    Thread(target=archive_loop, daemon=True).start()
@@ -1,17 +1,165 @@
 import os
 import json
 import glob
-from threading import RLock
+from dataclasses import dataclass, field, fields, MISSING
+from threading import RLock, Event, Timer
 import time
 
+from settings import TASK_SAVE_INTERVAL
+
 TASKS_FILE = "tasks.json"
-tasks = {}
+tasks = {}  # task_id -> TaskRecord
 task_lock = RLock()
+tasks_loaded = Event()  # 🚦 Nothing is written to disk until the stored tasks have been read
+save_timer = None
+last_saved = 0.0
+
+
+@dataclass(slots=True, eq=False)
+class TaskRecord:
+    """🧾 One download task. Progress is kept numeric and only formatted by to_api().
+
+    Supports the dict-style access (task["status"], task.get(...), "x" in task)
+    used across the code base; unknown keys live in `extra`.
+    """
+    id: str
+    url: str = None
+    title: str = None
+    type: str = None
+    format: str = None
+    quality: str = None
+    status: str = "queued"
+    progress: str = "0%"  # state label: "0%", "Paused", "Post-processing", "100%", "Error"
+    paused: bool = False
+    should_abort: bool = False
+    downloaded_bytes: int = 0
+    total_bytes: int = 0
+    expected_bytes: int = None  # size of the selected formats, for disk admission
+    hold_reason: str = None
+    speed: float = 0.0  # bytes per second
+    eta: int = None  # seconds
+    filename: str = None
+    final_path: str = None
+    thumbnail: str = None
+    thumbnail_path: str = None
+    info_ref: dict = None
+    parent_id: str = None
+    playlist_index: int = None
+    children: list = None
+    created_at: float = None
+    finished_at: float = None
+    extra: dict = field(default_factory=dict)
+
+    # 🔑 dict-style access
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_DEFAULTS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        if key in _FIELD_DEFAULTS:
+            return getattr(self, key) is not None
+        return key in self.extra
+
+    def get(self, key, default=None):
+        if key in _FIELD_DEFAULTS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default)
+
+    def pop(self, key, default=None):
+        if key in _FIELD_DEFAULTS:
+            value = self.get(key, default)
+            setattr(self, key, _default_for(key))
+            return value
+        return self.extra.pop(key, default)
+
+    def update(self, updates):
+        for key, value in updates.items():
+            self[key] = value
+
+    # 💾 persistence / API
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a stored or legacy dict (string speed/ETA are dropped)"""
+        data = dict(data)
+        known = {k: data.pop(k) for k in list(data) if k in _FIELD_DEFAULTS and k != "extra"}
+        extra = data.pop("extra", None) or {}
+        extra.update(data)
+
+        legacy_speed = extra.pop("speed_bps", None)
+        if not isinstance(known.get("speed"), (int, float)):
+            known["speed"] = legacy_speed or 0.0
+        if isinstance(known.get("eta"), (int, float)):
+            known["eta"] = int(known["eta"])
+        else:
+            known["eta"] = None
+        for key in ("downloaded_bytes", "total_bytes"):
+            if not isinstance(known.get(key), (int, float)):
+                known[key] = 0
+        return cls(extra=extra, **known)
+
+    def to_dict(self):
+        """Compact form for tasks.json: defaults are omitted"""
+        data = {}
+        for key, default in _FIELD_DEFAULTS.items():
+            value = getattr(self, key)
+            if key == "extra":
+                data.update(value)
+            elif key == "id" or value != default:
+                data[key] = value
+        return data
+
+    def to_api(self):
+        """Full dict with human-readable progress, speed and ETA"""
+        from utils import format_eta
+
+        data = {key: getattr(self, key) for key in _FIELD_DEFAULTS if key != "extra"}
+        data = {key: value for key, value in data.items() if value is not None}
+        data.update(self.extra)
+        if self.status == "running" and self.total_bytes:
+            data["progress"] = f"{(self.downloaded_bytes / self.total_bytes) * 100:.2f}%"
+        data["speed"] = f"{(self.speed / 1024):.2f} KBps" if self.speed else "N/A"
+        data["eta"] = format_eta(self.eta)
+        return data
+
+
+def _default_for(key):
+    f = TaskRecord.__dataclass_fields__[key]
+    return f.default_factory() if f.default_factory is not MISSING else f.default
+
+
+_FIELD_DEFAULTS = {f.name: None if f.name == "id" else _default_for(f.name) for f in fields(TaskRecord)}
+
+
+def as_record(task_data):
+    """🧾 Accept either a TaskRecord or a plain dict"""
+    return task_data if isinstance(task_data, TaskRecord) else TaskRecord.from_dict(task_data)
 
 
 def load_tasks():
-    """📥 Load all tasks from disk"""
+    """📥 Load all tasks from disk (tasks added meanwhile are kept)"""
     global tasks
+    with task_lock:
+        added_before_load = bool(tasks)
+    try:
+        _read_tasks_file()
+    finally:
+        tasks_loaded.set()
+    if added_before_load:
+        save_tasks()
+
+
+def _read_tasks_file():
     if not os.path.exists(TASKS_FILE):
         print("📂 No tasks.json found. Starting with empty task list.")
         return
@@ -26,29 +174,52 @@ def load_tasks():
             parsed_data = json.loads(content)
             if isinstance(parsed_data, dict):
                 with task_lock:
-                    tasks.clear()
-                    tasks.update(parsed_data)
+                    for task_id, task in parsed_data.items():
+                        if task_id not in tasks:
+                            tasks[task_id] = TaskRecord.from_dict({"id": task_id, **task})
                 print(f"✅ Loaded {len(tasks)} tasks from disk.")
             else:
                 print("⚠️ Invalid structure in tasks.json. Ignoring.")
     except Exception as e:
         print(f"[ERROR] Failed to load tasks: {e}")
-        with task_lock:
-            tasks.clear()
 
 
 def save_tasks():
     """💾 Save tasks safely to disk"""
+    global last_saved
+    if not tasks_loaded.is_set():
+        return
     try:
         with task_lock:
+            last_saved = time.time()
             tmp_file = TASKS_FILE + ".tmp"
+            data = {task_id: task.to_dict() for task_id, task in tasks.items()}
             with open(tmp_file, "w", encoding="utf-8") as f:
-                json.dump(tasks, f, indent=2, ensure_ascii=False)
+                json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
             os.replace(tmp_file, TASKS_FILE)
     except Exception as e:
         print(f"[ERROR] Failed to save tasks: {e}")
 
 
+def save_tasks_soon(delay=TASK_SAVE_INTERVAL):
+    """⏲️ Coalesce frequent changes (progress ticks) into one save per `delay` seconds"""
+    global save_timer
+    with task_lock:
+        if save_timer is not None:
+            return
+        save_timer = Timer(delay, _deferred_save, args=(time.time(),))
+        save_timer.daemon = True
+        save_timer.start()
+
+
+def _deferred_save(requested_at):
+    global save_timer
+    with task_lock:
+        save_timer = None
+        if last_saved < requested_at:  # otherwise a full save already covered it
+            save_tasks()
+
+
 def add_task(task_id, task_data):
     """➕ Add new task to memory + disk"""
     with task_lock:
@@ -56,7 +227,16 @@ def add_task(task_id, task_data):
             print(f"⚠️ Task with ID {task_id} already exists. Overwriting.")
         else:
             print(f"➕ Adding new task with ID {task_id}.")
-        tasks[task_id] = task_data
+        tasks[task_id] = as_record(task_data)
+    save_tasks()
+
+
+def add_tasks(new_tasks):
+    """➕ Add a batch of tasks with a single write to disk"""
+    with task_lock:
+        for task_data in new_tasks:
+            record = as_record(task_data)
+            tasks[record.id] = record
     save_tasks()
 
 
@@ -114,17 +294,8 @@ def delete_task(task_id):
         if not task:
             return
 
-        # 🔻 Delete thumbnail file
-        thumb_path = task.get("thumbnail_path")
-        if thumb_path:
-            if thumb_path.startswith("/"):
-                thumb_path = thumb_path.lstrip("/")
-            if os.path.exists(thumb_path):
-                try:
-                    os.remove(thumb_path)
-                    print(f"[{task_id}] 🗑️ Deleted thumbnail: {thumb_path}")
-                except Exception as e:
-                    print(f"[{task_id}] ⚠️ Failed to delete thumbnail: {e}")
+        # 🔻 Delete thumbnail and cached info
+        delete_task_files(task)
 
         # 🔻 Delete temp files
         delete_temp_files_for_task(task)
@@ -134,20 +305,103 @@ def delete_task(task_id):
         save_tasks()
 
 
+def delete_task_files(task):
+    """🧹 Remove the thumbnail, its small variant and the cached info of a task"""
+    task_id = task["id"]
+    thumb_path = task.get("thumbnail_path")
+    if thumb_path:
+        if thumb_path.startswith("/"):
+            thumb_path = thumb_path.lstrip("/")
+        from utils import get_thumbnail_variant_path
+
+        for path in (thumb_path, get_thumbnail_variant_path(thumb_path)):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                    print(f"[{task_id}] 🗑️ Deleted thumbnail: {path}")
+                except Exception as e:
+                    print(f"[{task_id}] ⚠️ Failed to delete thumbnail: {e}")
+
+    if task.get("info_ref"):
+        from info_cache import discard_info
+        discard_info(task["info_ref"])
+
+
+def playlist_summary(parent):
+    """📊 Aggregate bytes, item counts and ETA over a playlist's child tasks"""
+    children = [tasks[c] for c in parent.get("children", []) if c in tasks]
+    total_items = len(parent.get("children", []))
+    completed = sum(1 for c in children if c.get("status") == "completed")
+    failed = sum(1 for c in children if c.get("status") == "failed")
+    running = sum(1 for c in children if c.get("status") in ("running", "processing"))
+
+    downloaded = sum(c.get("downloaded_bytes") or 0 for c in children)
+    total = sum(c.get("total_bytes") or 0 for c in children)
+    speed = sum(c.speed for c in children if c.status == "running")
+
+    # Children that haven't started yet are assumed to be average-sized
+    sized = [c for c in children if c.get("total_bytes")]
+    unsized = sum(1 for c in children if not c.get("total_bytes") and c.get("status") not in ("completed", "failed"))
+    if sized and unsized > 0:
+        total += unsized * (sum(c["total_bytes"] for c in sized) / len(sized))
+
+    return {
+        "items_total": total_items,
+        "items_completed": completed,
+        "items_failed": failed,
+        "items_running": running,
+        "downloaded_bytes": downloaded,
+        "total_bytes": int(total),
+        "speed": speed,
+        "eta": int((total - downloaded) / speed) if speed and total > downloaded else None
+    }
+
+
+def refresh_playlist(parent_id):
+    """🔁 Settle a playlist task once none of its children are left to run"""
+    with task_lock:
+        parent = tasks.get(parent_id)
+        if not parent or "children" not in parent or parent.get("status") == "deleted":
+            return
+
+        remaining = [tasks[c] for c in parent["children"] if c in tasks]
+        if any(c.get("status") not in ("completed", "failed") for c in remaining):
+            if parent.get("status") in ("completed", "failed"):
+                parent["status"] = "expanded"
+                save_tasks()
+            return
+
+        failed = any(c.get("status") == "failed" for c in remaining)
+        parent["status"] = "failed" if failed else "completed"
+        parent["progress"] = "Error" if failed else "100%"
+        parent["finished_at"] = time.time()
+        save_tasks()
+
+
 def get_all_tasks():
     """📤 Return all task copies with resolved thumbnail URLs"""
     with task_lock:
         result = {}
         for task_id, task in tasks.items():
-            task_copy = task.copy()
+            task_copy = task.to_api()
           
-            path = task_copy.get("thumbnail_path")
+            from utils import get_thumbnail_url
 
-            if path and os.path.exists(path):
-                normalized = "/" + path.replace("\\", "/").lstrip("/")
-                task_copy["thumbnail_url"] = normalized
-            else:
-                task_copy["thumbnail_url"] = "/static/images/default-thumbnail.png"
+            task_copy["thumbnail_url"] = (
+                get_thumbnail_url(task_copy.get("thumbnail_path"))
+                or "/static/images/default-thumbnail.png"
+            )
+
+            if "children" in task:
+                from utils import format_eta
+
+                summary = playlist_summary(task)
+                task_copy.update(summary)
+                if task_copy.get("status") == "expanded":
+                    percent = (summary["downloaded_bytes"] / summary["total_bytes"] * 100) if summary["total_bytes"] else 0
+                    task_copy["progress"] = f"{percent:.2f}%"
+                task_copy["speed"] = f"{(summary['speed'] / 1024):.2f} KBps" if summary["speed"] else "N/A"
+                task_copy["eta"] = format_eta(summary["eta"])
 
             result[task_id] = task_copy
 
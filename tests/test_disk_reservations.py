@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from disk_admission import DiskAdmission
+from job_broker import JobBroker
+
+
+class SharedDiskReservationTest(unittest.TestCase):
+    """Two workers on one host must see each other's reservations"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.broker = JobBroker(os.path.join(self.dir, "jobs.sqlite3"))
+        self.admission = DiskAdmission(self.dir, self.dir, reserve=0)
+        free = shutil.disk_usage(self.dir).free
+        # Each download needs 2x its size in temp, so one fits and two don't
+        self.size = int(free * 0.3)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def reserve(self, task_id, host="host-a"):
+        return self.broker.reserve_disk(
+            task_id, host, self.size,
+            lambda others: self.admission.shortfall(task_id, self.size, others=others)
+        )
+
+    def test_sibling_reservation_is_counted(self):
+        self.assertIsNone(self.reserve("first"))
+        self.assertIsNotNone(self.reserve("second"))
+
+    def test_other_hosts_do_not_count(self):
+        self.assertIsNone(self.reserve("first", host="host-a"))
+        self.assertIsNone(self.reserve("second", host="host-b"))
+
+    def test_finish_releases_the_reservation(self):
+        self.broker.submit("first", {})
+        self.broker.claim("worker-1")
+        self.assertIsNone(self.reserve("first"))
+        self.broker.finish("first", "worker-1")
+        self.assertIsNone(self.reserve("second"))
+
+    def test_downloaded_bytes_shrink_the_reservation(self):
+        self.broker.submit("first", {})
+        self.broker.claim("worker-1")
+        self.assertIsNone(self.reserve("first"))
+        self.broker.heartbeat("first", "worker-1", self.size)
+        self.assertIsNone(self.reserve("second"))
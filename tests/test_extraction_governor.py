@@ -0,0 +1,101 @@
+import time
+import unittest
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from extraction_governor import ExtractionGovernor, ThrottledError, is_throttled, _retry_after
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """429 with Retry-After: 1 for the first request of every path, 200 afterwards"""
+    seen = {}
+
+    def _respond(self, body):
+        hits = self.seen[self.path] = self.seen.get(self.path, 0) + 1
+        if hits == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        if body:
+            self.wfile.write(b"\x00\x00\x00\x00")
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, *args):
+        pass
+
+
+class GovernorThrottleTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        ThrottlingHandler.seen.clear()
+        # Without Retry-After the first backoff would take 5 seconds
+        self.governor = ExtractionGovernor(max_concurrent=1, rate=0, backoff_base=5, max_retries=3)
+
+    def test_requests_429_honours_retry_after(self):
+        url = f"{self.base}/thumb.jpg"
+
+        def fetch():
+            response = requests.get(url, timeout=5)
+            if response.status_code == 429:
+                raise ThrottledError(url, response.headers.get("Retry-After"))
+            return response
+
+        started = time.monotonic()
+        response = self.governor.call(url, fetch)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ThrottlingHandler.seen["/thumb.jpg"], 2)
+        self.assertGreaterEqual(elapsed, 1.0)
+        self.assertLess(elapsed, 4.0)
+        self.assertEqual(self.governor.stats()["127.0.0.1:%d" % self.server.server_port]["throttled"], 1)
+
+    def test_wrapped_yt_dlp_error_is_recognized(self):
+        import yt_dlp
+
+        url = f"{self.base}/wrapped.mp4"
+        with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+            with self.assertRaises(yt_dlp.utils.DownloadError) as ctx:
+                ydl.extract_info(url, download=False)
+
+        self.assertTrue(is_throttled(ctx.exception))
+        self.assertEqual(_retry_after(ctx.exception), 1.0)
+
+    def test_yt_dlp_extraction_retries_after_429(self):
+        import yt_dlp
+
+        url = f"{self.base}/video.mp4"
+        started = time.monotonic()
+        with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+            info = self.governor.call(url, ydl.extract_info, url, download=False)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(info["url"], url)
+        self.assertGreaterEqual(elapsed, 1.0)
+        self.assertLess(elapsed, 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
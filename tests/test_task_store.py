@@ -0,0 +1,122 @@
+import unittest
+
+from task_store import TaskRecord, as_record
+
+
+LEGACY_TASK = {
+    "id": "ab12cd34",
+    "url": "https://www.youtube.com/watch?v=abc",
+    "title": "Some video",
+    "type": "video",
+    "format": "video",
+    "quality": "720",
+    "status": "paused",
+    "progress": "Paused",
+    "paused": True,
+    "should_abort": False,
+    "speed": "512.00 KBps",
+    "speed_bps": 524288.0,
+    "eta": "01:05",
+    "downloaded_bytes": "N/A",
+    "thumbnail_path": "thumbnails/ab12cd34.jpg",
+    "custom_flag": "kept",
+}
+
+
+class TaskRecordFromDictTest(unittest.TestCase):
+    def test_legacy_record_is_converted(self):
+        task = TaskRecord.from_dict(LEGACY_TASK)
+
+        self.assertEqual(task.id, "ab12cd34")
+        self.assertEqual(task.status, "paused")
+        self.assertTrue(task.paused)
+        # Formatted strings are dropped; the raw speed_bps survives as the numeric speed
+        self.assertEqual(task.speed, 524288.0)
+        self.assertIsNone(task.eta)
+        self.assertEqual(task.downloaded_bytes, 0)
+        self.assertEqual(task.total_bytes, 0)
+        # Unknown keys end up in `extra` and stay reachable dict-style
+        self.assertEqual(task.extra, {"custom_flag": "kept"})
+        self.assertEqual(task["custom_flag"], "kept")
+        self.assertNotIn("speed_bps", task)
+
+    def test_float_eta_becomes_whole_seconds(self):
+        task = TaskRecord.from_dict({"id": "t1", "eta": 125.7})
+        self.assertEqual(task.eta, 125)
+        self.assertEqual(task.to_api()["eta"], "02:05")
+
+    def test_as_record_keeps_records(self):
+        task = TaskRecord(id="t1")
+        self.assertIs(as_record(task), task)
+        self.assertIsInstance(as_record({"id": "t2"}), TaskRecord)
+
+
+class TaskRecordToDictTest(unittest.TestCase):
+    def test_defaults_are_omitted(self):
+        self.assertEqual(TaskRecord(id="t1").to_dict(), {"id": "t1"})
+
+    def test_round_trip(self):
+        task = TaskRecord.from_dict(LEGACY_TASK)
+        task.downloaded_bytes = 1024
+        task.total_bytes = 4096
+        task.eta = 30
+        task.children = ["t1-1", "t1-2"]
+        task["info_ref"] = {"path": "info_cache/x.info.json.gz", "extracted_at": 1.0}
+
+        data = task.to_dict()
+        self.assertEqual(data["custom_flag"], "kept")
+        self.assertNotIn("extra", data)
+        self.assertNotIn("should_abort", data)  # default value
+
+        restored = TaskRecord.from_dict(data)
+        self.assertEqual(restored.to_dict(), data)
+        for key in ("speed", "eta", "downloaded_bytes", "total_bytes", "children", "info_ref", "extra"):
+            self.assertEqual(getattr(restored, key), getattr(task, key), key)
+
+
+class TaskRecordDictAccessTest(unittest.TestCase):
+    def test_contains_treats_none_as_absent(self):
+        task = TaskRecord(id="t1")
+        self.assertNotIn("children", task)
+        self.assertNotIn("parent_id", task)
+        self.assertIn("status", task)  # default "queued" is a value
+        self.assertIn("paused", task)  # so is False
+
+        task["children"] = []
+        self.assertIn("children", task)
+        task["children"] = None
+        self.assertNotIn("children", task)
+
+    def test_get_and_getitem(self):
+        task = TaskRecord(id="t1")
+        self.assertEqual(task.get("eta", "fallback"), "fallback")  # None falls back
+        self.assertEqual(task.get("status"), "queued")
+        self.assertEqual(task.get("unknown", 5), 5)
+        self.assertEqual(task["status"], "queued")
+        with self.assertRaises(KeyError):
+            task["unknown"]
+        with self.assertRaises(KeyError):
+            task["eta"]
+
+    def test_pop_resets_fields_to_their_default(self):
+        task = TaskRecord(id="t1", should_abort=True, info_ref={"path": "x"})
+
+        self.assertTrue(task.pop("should_abort", None))
+        self.assertFalse(task.should_abort)
+        self.assertEqual(task.pop("info_ref", None), {"path": "x"})
+        self.assertIsNone(task.info_ref)
+        self.assertIsNone(task.pop("info_ref", None))
+
+        task["custom_flag"] = 1
+        self.assertEqual(task.pop("custom_flag"), 1)
+        self.assertEqual(task.pop("custom_flag", "gone"), "gone")
+
+    def test_setitem_and_update(self):
+        task = TaskRecord(id="t1")
+        task.update({"status": "running", "note": "x"})
+        self.assertEqual(task.status, "running")
+        self.assertEqual(task.extra, {"note": "x"})
+
+
+if __name__ == "__main__":
+    unittest.main()
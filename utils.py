@@ -1,7 +1,7 @@
 import os
 import time
-import yt_dlp
-from task_store import tasks, save_tasks, task_lock
+from task_store import tasks, save_tasks, save_tasks_soon, task_lock
+from settings import THUMBNAIL_VARIANT_DIR, THUMBNAIL_VARIANT_SIZE, MAX_CONCURRENT_DOWNLOADS, WORKER_MODE
 
 last_update_times = {}
 
@@ -48,6 +48,46 @@ def get_format_string(quality, stream_type):
     return "bestvideo+bestaudio"
 
 
+def get_thumbnail_variant_path(path):
+    """🖼️ Where the small dashboard copy of a stored thumbnail lives"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(THUMBNAIL_VARIANT_DIR, f"{name}.webp")
+
+
+def create_thumbnail_variant(path):
+    """🗜️ Store a resized, recompressed copy of a thumbnail (needs Pillow, optional)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    variant_path = get_thumbnail_variant_path(path)
+    if os.path.exists(variant_path):
+        return variant_path
+    try:
+        os.makedirs(THUMBNAIL_VARIANT_DIR, exist_ok=True)
+        with Image.open(path) as img:
+            img = img.convert("RGB")
+            img.thumbnail(THUMBNAIL_VARIANT_SIZE)
+            tmp_path = variant_path + ".tmp"
+            img.save(tmp_path, "WEBP", quality=75, method=4)
+        os.replace(tmp_path, variant_path)
+        return variant_path
+    except Exception as e:
+        print(f"[Thumbnail Warning] Failed to resize {path}: {e}")
+        return None
+
+
+def get_thumbnail_url(path):
+    """🔗 URL for a stored thumbnail, preferring its small variant"""
+    if not path or not os.path.exists(path):
+        return None
+    variant_path = get_thumbnail_variant_path(path)
+    if os.path.exists(variant_path):
+        path = variant_path
+    return "/" + path.replace("\\", "/").lstrip("/")
+
+
 def format_eta(seconds):
     """⏳ Convert ETA seconds to human-readable string"""
     if not seconds or seconds < 0:
@@ -58,10 +98,18 @@ def format_eta(seconds):
     return f"{hrs:02}:{mins:02}:{secs:02}" if hrs else f"{mins:02}:{secs:02}"
 
 
+def max_running_tasks():
+    """🔢 Download limit: the setting, or the live worker count if that is higher"""
+    if WORKER_MODE:
+        from worker_bridge import worker_capacity
+        return max(MAX_CONCURRENT_DOWNLOADS, worker_capacity())
+    return MAX_CONCURRENT_DOWNLOADS
+
+
 def can_start_new_task():
-    """Check if less than 4 downloads are currently running"""
+    """Check if another download may start"""
     with task_lock:
-        return sum(1 for t in tasks.values() if t.get('status') == 'running') < 4
+        return sum(1 for t in tasks.values() if t.get('status') == 'running') < max_running_tasks()
 
 
 def generate_progress_hook(task_id):
@@ -81,6 +129,8 @@ def generate_progress_hook(task_id):
 
             # 🛑 Abort/Pause/Delete Logic
             if task.get("should_abort") or task.get("paused") or task.get("status") == "deleted":
+                import yt_dlp
+
                 print(f"[{task_id}] ❌ Download cancelled due to abort/pause/delete.")
                 
                 part_path = d.get("filename")
@@ -97,36 +147,35 @@ def generate_progress_hook(task_id):
             status = d.get("status")
             
             if status == 'downloading':
-                downloaded = d.get('downloaded_bytes', 0)
-                total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-                percent = (downloaded / total) * 100 if total else 0
-                task['progress'] = f"{percent:.2f}%"
-                task['downloaded_bytes'] = downloaded
-                task['total_bytes'] = total
-                speed = d.get('speed')
-                task['speed'] = f"{(speed / 1024):.2f} KBps" if speed else "N/A"
-                task['eta'] = format_eta(d.get('eta')) if d.get('eta') else "N/A"
+                # Raw numbers only; TaskRecord.to_api() formats them for the UI
+                task.downloaded_bytes = d.get('downloaded_bytes') or 0
+                task.total_bytes = int(d.get('total_bytes') or d.get('total_bytes_estimate') or 0)
+                task.speed = d.get('speed') or 0.0
+                eta = d.get('eta')  # the fragment downloader reports a float
+                task.eta = int(eta) if eta is not None else None
 
             elif status == 'finished':
-                task['progress'] = 'Post-processing'
-                task['status'] = 'processing'
+                task.progress = 'Post-processing'
+                task.status = 'processing'
+                task.speed = 0.0
+                task.eta = None
 
             # 🔍 Thumbnail
             if 'thumbnail' in d and d['thumbnail'] and not task.get("thumbnail"):
                 task['thumbnail'] = d['thumbnail']
 
-            save_tasks()
+            # Byte counters change every tick; only state changes are written right away
+            if status == 'finished':
+                save_tasks()
+            else:
+                save_tasks_soon()
             last_update_times[task_id] = current_time
 
             # ✅ Trigger next task if finished
             if status == 'finished':
                 try:
-                    from download_manager import enqueue_download  # ✅ safe to import here
-                    for next_id, t in tasks.items():
-                        if t['status'] == 'queued' and not t.get('paused') and can_start_new_task():
-                            t['status'] = 'running'
-                            enqueue_download(next_id, t['url'], t['quality'], t['format'])
-                            break
+                    from download_manager import start_next_queued_task  # ✅ safe to import here
+                    start_next_queued_task()
                 except Exception as e:
                     print(f"[{task_id}] ⚠️ Failed to queue next task: {e}")
 
@@ -0,0 +1,132 @@
+"""🏭 Out-of-process download worker.
+
+Run the web app with YTD_WORKER_MODE=1 and start one or more workers pointing
+at the same broker database:
+
+    python worker.py --processes 4 --broker jobs.sqlite3
+"""
+import os
+import time
+import socket
+import argparse
+from threading import Thread, Event
+from multiprocessing import Process
+
+from settings import BROKER_PATH, BROKER_POLL_SECONDS
+
+# Fields mirrored back to the web process while a job runs
+REPORTED_FIELDS = (
+    "status", "progress", "downloaded_bytes", "total_bytes",
+    "speed", "eta", "final_path", "info_ref", "thumbnail",
+    "expected_bytes", "hold_reason", "finished_at"
+)
+
+
+def snapshot(task):
+    return {k: task.get(k) for k in REPORTED_FIELDS}
+
+
+def report_loop(broker, worker_id, task_id, stop):
+    """📡 Push progress diffs and pick up cancellations until the job ends"""
+    from task_store import tasks, task_lock
+
+    last = {}
+    while not stop.wait(BROKER_POLL_SECONDS):
+        cancelled = broker.heartbeat(task_id, worker_id, last.get("downloaded_bytes"))
+        with task_lock:
+            task = tasks.get(task_id)
+            if not task:
+                return
+            if cancelled:
+                task["should_abort"] = True
+            current = snapshot(task)
+        changed = {k: v for k, v in current.items() if last.get(k) != v}
+        if changed:
+            broker.report(task_id, changed)
+            last.update(changed)
+
+
+def process_job(broker, worker_id, job):
+    from task_store import tasks, task_lock, TaskRecord
+    from download_manager import run_download
+
+    task_id = job["task_id"]
+    print(f"[{worker_id}] 🎣 Claimed {task_id}")
+
+    # task_store is never loaded here, so nothing is written to tasks.json
+    with task_lock:
+        tasks[task_id] = TaskRecord(
+            id=task_id,
+            url=job["url"],
+            quality=job["quality"],
+            format=job["format"],
+            status="running",
+            info_ref=job.get("info_ref")
+        )
+
+    stop = Event()
+    reporter = Thread(target=report_loop, args=(broker, worker_id, task_id, stop), daemon=True)
+    reporter.start()
+    try:
+        run_download(task_id, job["url"], job["quality"], job["format"])
+    finally:
+        stop.set()
+        reporter.join()
+        with task_lock:
+            task = tasks.pop(task_id, None)
+        if task:
+            broker.report(task_id, snapshot(task))
+        broker.finish(task_id, worker_id)
+
+
+def work(broker_path, poll):
+    """🔁 Claim and run jobs one at a time, forever"""
+    from job_broker import JobBroker
+    from download_manager import disk_admission
+
+    broker = JobBroker(broker_path)
+    host = socket.gethostname()
+    worker_id = f"{host}:{os.getpid()}"
+    # Each worker only sees its own job, so sibling downloads on this host
+    # reserve their disk space through the broker
+    disk_admission.shared = lambda task_id, expected, check: broker.reserve_disk(task_id, host, expected, check)
+    print(f"[{worker_id}] 🏭 Worker ready (broker: {broker_path})")
+    while True:
+        try:
+            job = broker.claim(worker_id)
+        except Exception as e:
+            print(f"[{worker_id}] ⚠️ Failed to claim job: {e}")
+            job = None
+        if not job:
+            time.sleep(poll)
+            continue
+        try:
+            process_job(broker, worker_id, job)
+        except Exception as e:
+            print(f"[{worker_id}] ❌ Job {job['task_id']} crashed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run download workers for the web app.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--broker", default=BROKER_PATH, help="path to the shared broker database")
+    parser.add_argument("--poll", type=float, default=BROKER_POLL_SECONDS)
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        work(args.broker, args.poll)
+        return
+
+    workers = [Process(target=work, args=(args.broker, args.poll), daemon=True)
+               for _ in range(args.processes)]
+    for p in workers:
+        p.start()
+    try:
+        for p in workers:
+            p.join()
+    except KeyboardInterrupt:
+        print("\n[EXIT] Stopping workers...")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import time
+from threading import Thread, Lock
+
+from task_store import tasks, save_tasks, task_lock, refresh_playlist
+from settings import BROKER_PATH, BROKER_POLL_SECONDS, WORKER_STALE_SECONDS
+
+bridge_lock = Lock()
+broker = None
+sync_thread = None
+active_jobs = set()
+capacity = 0  # live worker processes, refreshed by sync_loop
+
+
+def get_broker():
+    global broker
+    with bridge_lock:
+        if broker is None:
+            from job_broker import JobBroker
+            broker = JobBroker(BROKER_PATH)
+        return broker
+
+
+def submit_job(task_id, video_url, quality, fmt):
+    """📤 Hand a download to the worker processes instead of a local thread"""
+    with task_lock:
+        task = tasks.get(task_id)
+        info_ref = task.get("info_ref") if task else None
+
+    get_broker().submit(task_id, {
+        "url": video_url,
+        "quality": quality,
+        "format": fmt,
+        "info_ref": info_ref
+    })
+    with bridge_lock:
+        active_jobs.add(task_id)
+    start_sync()
+
+
+def start_sync():
+    global sync_thread
+    with bridge_lock:
+        if sync_thread is None or not sync_thread.is_alive():
+            sync_thread = Thread(target=sync_loop, daemon=True)
+            sync_thread.start()
+
+
+def worker_capacity():
+    return capacity
+
+
+def sync_loop():
+    """🔄 Apply worker progress to task_store and push pause/delete as cancellations"""
+    global capacity
+    last_id = 0
+    last_stale_check = 0
+    while True:
+        try:
+            last_id = sync_once(last_id)
+            live = get_broker().live_workers(WORKER_STALE_SECONDS)
+            grew = live > capacity
+            capacity = live
+            if grew:
+                from download_manager import start_next_queued_task
+                start_next_queued_task()
+            if time.time() - last_stale_check > WORKER_STALE_SECONDS:
+                last_stale_check = time.time()
+                requeued = get_broker().requeue_stale(WORKER_STALE_SECONDS)
+                if requeued:
+                    print(f"[Broker] ♻️ Re-queued {requeued} job(s) from unresponsive workers.")
+        except Exception as e:
+            print(f"[Broker Warning] {e}")
+        time.sleep(BROKER_POLL_SECONDS)
+
+
+def sync_once(last_id):
+    jobs = get_broker()
+    updates = jobs.fetch_updates(last_id)
+    finished = False
+    cancelled = []
+    parents = set()
+
+    with task_lock:
+        for row_id, task_id, fields in updates:
+            last_id = row_id
+            task = tasks.get(task_id)
+            # Local pause/delete wins over whatever the worker still reports
+            if not task or task.get("should_abort") or task.get("paused") or task.get("status") == "deleted":
+                continue
+            task.update(fields)
+            if fields.get("status") in ("completed", "failed", "held"):
+                finished = True
+                if task.get("parent_id"):
+                    parents.add(task["parent_id"])
+                with bridge_lock:
+                    active_jobs.discard(task_id)
+
+        with bridge_lock:
+            for task_id in list(active_jobs):
+                task = tasks.get(task_id)
+                if not task or task.get("should_abort") or task.get("paused"):
+                    cancelled.append(task_id)
+                    active_jobs.discard(task_id)
+
+        if updates:
+            save_tasks()
+
+    for parent_id in parents:
+        refresh_playlist(parent_id)
+    for task_id in cancelled:
+        jobs.cancel(task_id)
+    if updates:
+        jobs.prune_updates(last_id)
+    if finished or cancelled:
+        from download_manager import start_next_queued_task
+        start_next_queued_task()
+    return last_id
+
+
+def stats():
+    with bridge_lock:
+        active = len(active_jobs)
+    return {"active_jobs": active, "workers": capacity, "jobs": get_broker().stats()}
@@ -0,0 +1,168 @@
+import json
+import time
+from contextlib import contextmanager
+from threading import Condition, Lock
+
+from settings import YDL_POOL_SIZE, HTTP_POOL_SIZE
+
+
+class _PooledYDL:
+    """🔌 A reusable YoutubeDL plus the hooks of whoever has it checked out"""
+
+    def __init__(self, opts):
+        import yt_dlp
+
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+        opts = dict(opts)
+        opts["progress_hooks"] = [self._dispatch_progress]
+        opts["postprocessor_hooks"] = [self._dispatch_postprocessor]
+        self.ydl = yt_dlp.YoutubeDL(opts)
+
+    def _dispatch_progress(self, d):
+        for hook in self.progress_hooks:
+            hook(d)
+
+    def _dispatch_postprocessor(self, d):
+        for hook in self.postprocessor_hooks:
+            hook(d)
+
+    def close(self):
+        try:
+            self.ydl.close()
+        except Exception as e:
+            print(f"[Pool Warning] Failed to close YoutubeDL: {e}")
+
+
+class YDLPool:
+    """♻️ Long-lived YoutubeDL instances keyed by option profile"""
+
+    def __init__(self, max_per_profile=YDL_POOL_SIZE):
+        self.max_per_profile = max_per_profile
+        self.cond = Condition()
+        self.idle = {}      # key -> [_PooledYDL]
+        self.in_use = {}    # key -> count
+        self.stats_by_profile = {}
+
+    def _key(self, profile, opts):
+        static = {k: v for k, v in opts.items() if k not in ("progress_hooks", "postprocessor_hooks")}
+        return profile, json.dumps(static, sort_keys=True, default=repr)
+
+    def _profile_stats(self, profile):
+        return self.stats_by_profile.setdefault(profile, {
+            "created": 0, "checkouts": 0, "reuses": 0,
+            "waits": 0, "wait_seconds": 0.0, "discarded": 0
+        })
+
+    @contextmanager
+    def checkout(self, profile, opts, progress_hooks=None, postprocessor_hooks=None, max_in_use=None):
+        """📤 Borrow a YoutubeDL for one operation, waiting if the profile is at capacity.
+
+        `max_in_use` overrides the pool size for callers that are already bounded
+        elsewhere (downloads are limited by the running-task limit).
+        """
+        key = self._key(profile, opts)
+        limit = max_in_use or self.max_per_profile
+        pooled = None
+
+        with self.cond:
+            stats = self._profile_stats(profile)
+            stats["checkouts"] += 1
+            started = time.time()
+            waited = False
+            while True:
+                idle = self.idle.get(key)
+                if idle:
+                    pooled = idle.pop()
+                    stats["reuses"] += 1
+                    break
+                if self.in_use.get(key, 0) < limit:
+                    break
+                waited = True
+                self.cond.wait()
+            if waited:
+                stats["waits"] += 1
+                stats["wait_seconds"] += time.time() - started
+            self.in_use[key] = self.in_use.get(key, 0) + 1
+
+        try:
+            if pooled is None:
+                pooled = _PooledYDL(opts)
+                with self.cond:
+                    stats["created"] += 1
+        except BaseException:
+            self._release(key, None)
+            raise
+
+        pooled.progress_hooks = list(progress_hooks or [])
+        pooled.postprocessor_hooks = list(postprocessor_hooks or [])
+        healthy = False
+        try:
+            yield pooled.ydl
+            healthy = True
+        finally:
+            pooled.progress_hooks = []
+            pooled.postprocessor_hooks = []
+            # An interrupted operation may leave the instance half-way through a download
+            self._release(key, pooled if healthy else None)
+            if not healthy:
+                pooled.close()
+                with self.cond:
+                    stats["discarded"] += 1
+
+    def _release(self, key, pooled):
+        with self.cond:
+            self.in_use[key] -= 1
+            if pooled is not None:
+                self.idle.setdefault(key, []).append(pooled)
+            self.cond.notify_all()
+
+    def stats(self):
+        """📊 Pool size, waits and reuse ratio per profile"""
+        with self.cond:
+            result = {}
+            for profile, stats in self.stats_by_profile.items():
+                keys = [k for k in set(self.idle) | set(self.in_use) if k[0] == profile]
+                idle = sum(len(self.idle.get(k, [])) for k in keys)
+                in_use = sum(self.in_use.get(k, 0) for k in keys)
+                checkouts = stats["checkouts"]
+                result[profile] = {
+                    **stats,
+                    "size": idle + in_use,
+                    "idle": idle,
+                    "in_use": in_use,
+                    "option_sets": len(keys),
+                    "reuse_ratio": round(stats["reuses"] / checkouts, 3) if checkouts else 0.0
+                }
+            return result
+
+    def close_all(self):
+        """🧹 Close every idle instance"""
+        with self.cond:
+            idle = [p for items in self.idle.values() for p in items]
+            self.idle.clear()
+        for pooled in idle:
+            pooled.close()
+
+
+_session = None
+_session_lock = Lock()
+
+
+def get_http_session():
+    """🌐 Shared keep-alive requests.Session (requests is imported on first use)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+ydl_pool = YDLPool()